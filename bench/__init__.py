@@ -0,0 +1 @@
+# 各驱动基准测试，见 bench/run.py
@@ -0,0 +1,409 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : run.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# 驱动基准测试：同一组负载依次跑 mysql / pg 下各个类，输出吞吐（ops/s）和 p50/p95/p99 延迟
+# 负载：point 主键单行查询，fetch_10k 取 1 万行，bulk_insert 每次批量插入 1000 行，
+#      paginate query_many 分页，procedure 存储过程（pg 为函数）调用
+# 需要本地数据库，如：
+#   docker run -d -p 3306:3306 -e MYSQL_ROOT_PASSWORD=bench -e MYSQL_DATABASE=bench mysql:8
+#   docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=bench -e POSTGRES_DB=bench postgres:16
+# 在项目根目录运行：
+#   python -m bench.run --password bench
+#   python -m bench.run --password bench --only asyncpg,psycopg2 --scale 0.2 --json result.json
+# 测试会重建 bench_items / bench_insert 表和 bench_get 存储过程；驱动未安装的类跳过
+
+import argparse
+import asyncio
+import datetime
+import importlib
+import inspect
+import json
+import math
+import sys
+import time
+
+ROWS = 10000
+BATCH = 1000
+PER_PAGE = 20
+
+# 负载名 -> 默认次数
+WORKLOADS = {
+    "point": 2000,
+    "fetch_10k": 20,
+    "bulk_insert": 20,
+    "paginate": 100,
+    "procedure": 1000,
+}
+
+# (驱动, 模块, 类名)
+MYSQL_CLASSES = [
+    ("pymysql", "dbs.mysql.sync.pymysql_db", "DB"),
+    ("mysqlclient", "dbs.mysql.sync.mysqldb_db", "DB"),
+    ("aiomysql", "dbs.mysql.aio.aiomysql_db", "MySQLDB"),
+    ("aiomysql", "dbs.mysql.aio.aiomysql_db", "MySQLDBPool"),
+]
+
+PG_CLASSES = [
+    ("psycopg2", "dbs.pg.sync.psycopg2_db", "PGDB"),
+    ("psycopg2", "dbs.pg.sync.psycopg2_db", "PGDBPool"),
+    ("pg8000", "dbs.pg.sync.pg8000_db", "DB"),
+    ("aiopg", "dbs.pg.aio.aiopg_db", "PGDB"),
+    ("aiopg", "dbs.pg.aio.aiopg_db", "PGDBPool"),
+    ("asyncpg", "dbs.pg.aio.asyncpg_db", "PGDB"),
+    ("asyncpg", "dbs.pg.aio.asyncpg_db", "PGDBPool"),
+]
+
+MYSQL_SETUP = [
+    "DROP TABLE IF EXISTS bench_items",
+    "CREATE TABLE bench_items (id INT PRIMARY KEY, name VARCHAR(64) NOT NULL, qty INT NOT NULL, "
+    "price DOUBLE NOT NULL, created_at DATETIME NOT NULL)",
+    "DROP TABLE IF EXISTS bench_insert",
+    "CREATE TABLE bench_insert (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(64) NOT NULL, qty INT NOT NULL, "
+    "price DOUBLE NOT NULL, created_at DATETIME NOT NULL)",
+    "DROP PROCEDURE IF EXISTS bench_get",
+    "CREATE PROCEDURE bench_get(IN p_id INT) BEGIN SELECT * FROM bench_items WHERE id = p_id; END",
+]
+
+PG_SETUP = [
+    "DROP TABLE IF EXISTS bench_items CASCADE",
+    "CREATE TABLE bench_items (id INT PRIMARY KEY, name VARCHAR(64) NOT NULL, qty INT NOT NULL, "
+    "price DOUBLE PRECISION NOT NULL, created_at TIMESTAMP NOT NULL)",
+    "DROP TABLE IF EXISTS bench_insert",
+    "CREATE TABLE bench_insert (id SERIAL PRIMARY KEY, name VARCHAR(64) NOT NULL, qty INT NOT NULL, "
+    "price DOUBLE PRECISION NOT NULL, created_at TIMESTAMP NOT NULL)",
+    "CREATE FUNCTION bench_get(p_id INT) RETURNS SETOF bench_items AS "
+    "$$ SELECT * FROM bench_items WHERE id = p_id $$ LANGUAGE sql STABLE",
+]
+
+
+def make_rows(start, count):
+    now = datetime.datetime(2024, 1, 1)
+    return [("item-%d" % i, i % 97, i * 0.25, now + datetime.timedelta(seconds=i)) for i in range(start, start + count)]
+
+
+def item_id(i):
+    return i % ROWS + 1
+
+
+def page_no(i):
+    return i % (ROWS // PER_PAGE) + 1
+
+
+def load_class(module, name):
+    """导入驱动类，驱动未安装返回 None"""
+    try:
+        return getattr(importlib.import_module(module), name)
+    except ImportError:
+        return None
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)  # nearest-rank
+    return sorted_values[index]
+
+
+def summarize(name, latencies, elapsed, rows_per_op):
+    latencies.sort()
+    ops = len(latencies)
+    return {
+        "workload": name,
+        "ops": ops,
+        "ops_per_sec": ops / elapsed if elapsed else 0.0,
+        "rows_per_sec": ops * rows_per_op / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+# ---- 各类的负载适配：返回 {负载名: (op(i), 每次行数)}，不支持的负载不出现 ----
+
+def mysql_sync_ops(db):
+    rows = make_rows(0, BATCH)
+    return {
+        "point": (lambda i: db.query_one("SELECT * FROM bench_items WHERE id = %s", (item_id(i),)), 1),
+        "fetch_10k": (lambda i: db.query_all("SELECT * FROM bench_items LIMIT %s", (ROWS,)), ROWS),
+        "bulk_insert": (lambda i: db.insert_many(
+            "INSERT INTO bench_insert (name, qty, price, created_at) VALUES (%s, %s, %s, %s)", rows), BATCH),
+        "paginate": (lambda i: db.query_many("SELECT * FROM bench_items ORDER BY id", None, page_no(i), PER_PAGE),
+                     PER_PAGE),
+        "procedure": (lambda i: db.fetchone_procedure("bench_get", (item_id(i),)), 1),
+    }
+
+
+async def mysql_async_ops(db):
+    rows = make_rows(0, BATCH)
+    if hasattr(db, "start"):
+        await db.start()
+        proc_target = None  # 传 None 使用连接池
+    else:
+        proc_target = await db.get_connection()
+        db.bench_conn = proc_target
+    return {
+        "point": (lambda i: db.query_one("SELECT * FROM bench_items WHERE id = %s", (item_id(i),)), 1),
+        "fetch_10k": (lambda i: db.query_all("SELECT * FROM bench_items LIMIT %s", (ROWS,)), ROWS),
+        "bulk_insert": (lambda i: db.insert_many(
+            "INSERT INTO bench_insert (name, qty, price, created_at) VALUES (%s, %s, %s, %s)", rows), BATCH),
+        "paginate": (lambda i: db.query_many("SELECT * FROM bench_items ORDER BY id", None, page_no(i), PER_PAGE),
+                     PER_PAGE),
+        "procedure": (lambda i: db.fetchone_procedure(proc_target, "bench_get", (item_id(i),)), 1),
+    }
+
+
+def pg_format_ops(db):
+    """psycopg2 / pg8000 / aiopg，%s 占位符"""
+    rows = make_rows(0, BATCH)
+    ops = {
+        "point": (lambda i: db.query_one("SELECT * FROM bench_items WHERE id = %s", (item_id(i),)), 1),
+        "paginate": (lambda i: db.query_many("SELECT * FROM bench_items ORDER BY id", None, page_no(i), PER_PAGE),
+                     PER_PAGE),
+        "procedure": (lambda i: db.query_one("SELECT * FROM bench_get(%s)", (item_id(i),)), 1),
+    }
+    if hasattr(db, "query_all"):
+        ops["fetch_10k"] = (lambda i: db.query_all("SELECT * FROM bench_items LIMIT %s", (ROWS,)), ROWS)
+    if hasattr(db, "insert_many"):
+        ops["bulk_insert"] = (lambda i: db.insert_many(
+            "INSERT INTO bench_insert (name, qty, price, created_at) VALUES (%s, %s, %s, %s)", rows), BATCH)
+    return ops
+
+
+async def pg_async_format_ops(db):
+    if hasattr(db, "start"):
+        await db.start()
+    return pg_format_ops(db)
+
+
+async def asyncpg_ops(db):
+    rows = make_rows(0, BATCH)
+    if hasattr(db, "start"):
+        await db.start()
+    return {
+        "point": (lambda i: db.query_one("SELECT * FROM bench_items WHERE id = $1", item_id(i)), 1),
+        "fetch_10k": (lambda i: db.query_all("SELECT * FROM bench_items LIMIT $1", ROWS), ROWS),
+        "bulk_insert": (lambda i: db.insert_many(
+            "INSERT INTO bench_insert (name, qty, price, created_at) VALUES ($1, $2, $3, $4)", rows), BATCH),
+        "procedure": (lambda i: db.query_one("SELECT * FROM bench_get($1)", item_id(i)), 1),
+    }
+
+
+ADAPTERS = {
+    "pymysql": mysql_sync_ops,
+    "mysqlclient": mysql_sync_ops,
+    "aiomysql": mysql_async_ops,
+    "psycopg2": pg_format_ops,
+    "pg8000": pg_format_ops,
+    "aiopg": pg_async_format_ops,
+    "asyncpg": asyncpg_ops,
+}
+
+
+# ---- 运行 ----
+
+def run_sync(ops, iterations, warmup):
+    results = []
+    for name, count in iterations.items():
+        if name not in ops:
+            continue
+        op, rows_per_op = ops[name]
+        for i in range(min(warmup, count)):
+            op(i)
+        latencies = []
+        begin = time.perf_counter()
+        for i in range(count):
+            t = time.perf_counter()
+            op(i)
+            latencies.append(time.perf_counter() - t)
+        results.append(summarize(name, latencies, time.perf_counter() - begin, rows_per_op))
+    return results
+
+
+async def run_async(ops, iterations, warmup):
+    results = []
+    for name, count in iterations.items():
+        if name not in ops:
+            continue
+        op, rows_per_op = ops[name]
+        for i in range(min(warmup, count)):
+            await op(i)
+        latencies = []
+        begin = time.perf_counter()
+        for i in range(count):
+            t = time.perf_counter()
+            await op(i)
+            latencies.append(time.perf_counter() - t)
+        results.append(summarize(name, latencies, time.perf_counter() - begin, rows_per_op))
+    return results
+
+
+def close_sync(db):
+    """有 close() 的类（可重复调用）用 close()，否则关闭未关闭的 conn"""
+    if hasattr(db, "close"):
+        db.close()
+        return
+    conn = getattr(db, "conn", None)
+    if conn is not None and not getattr(conn, "closed", False):
+        conn.close()
+
+
+async def close_async(db):
+    conn = getattr(db, "bench_conn", None)
+    if conn is not None:
+        conn.close()
+    if hasattr(db, "close"):
+        await db.close()
+
+
+def bench_class(driver, module, name, params, iterations, warmup):
+    cls = load_class(module, name)
+    if cls is None:
+        print("skip %s.%s: %s not installed" % (module, name, driver), file=sys.stderr)
+        return None
+    adapter = ADAPTERS[driver]
+    db = cls(**params)
+    if inspect.iscoroutinefunction(adapter):
+        async def run():
+            try:
+                return await run_async(await adapter(db), iterations, warmup)
+            finally:
+                await close_async(db)
+
+        return asyncio.run(run())
+    try:
+        return run_sync(adapter(db), iterations, warmup)
+    finally:
+        close_sync(db)
+
+
+def setup_mysql(params):
+    """建表、灌数据，用 pymysql，没有则用 aiomysql"""
+    cls = load_class("dbs.mysql.sync.pymysql_db", "DB")
+    insert = "INSERT INTO bench_items (id, name, qty, price, created_at) VALUES (%s, %s, %s, %s, %s)"
+    if cls is not None:
+        db = cls(**params)
+        for sql in MYSQL_SETUP:
+            db.execute(sql)
+        for start in range(0, ROWS, BATCH):
+            db.insert_many(insert, [(start + n + 1,) + row for n, row in enumerate(make_rows(start, BATCH))])
+        db.close()
+        return True
+    cls = load_class("dbs.mysql.aio.aiomysql_db", "MySQLDB")
+    if cls is None:
+        return False
+
+    async def run():
+        db = cls(**params)
+        for sql in MYSQL_SETUP:
+            await db.execute(sql)
+        for start in range(0, ROWS, BATCH):
+            await db.insert_many(insert, [(start + n + 1,) + row for n, row in enumerate(make_rows(start, BATCH))])
+
+    asyncio.run(run())
+    return True
+
+
+def setup_pg(params):
+    """建表、灌数据，用 psycopg2，没有则用 asyncpg"""
+    cls = load_class("dbs.pg.sync.psycopg2_db", "PGDB")
+    if cls is not None:
+        db = cls(**params)
+        for sql in PG_SETUP:
+            db.execute(sql)
+        insert = "INSERT INTO bench_items (id, name, qty, price, created_at) VALUES (%s, %s, %s, %s, %s)"
+        for start in range(0, ROWS, BATCH):
+            db.insert_many(insert, [(start + n + 1,) + row for n, row in enumerate(make_rows(start, BATCH))])
+        db.conn.close()
+        return True
+    cls = load_class("dbs.pg.aio.asyncpg_db", "PGDB")
+    if cls is None:
+        return False
+
+    async def run():
+        db = cls(**params)
+        for sql in PG_SETUP:
+            await db.update(sql)
+        insert = "INSERT INTO bench_items (id, name, qty, price, created_at) VALUES ($1, $2, $3, $4, $5)"
+        for start in range(0, ROWS, BATCH):
+            await db.insert_many(insert, [(start + n + 1,) + row for n, row in enumerate(make_rows(start, BATCH))])
+
+    asyncio.run(run())
+    return True
+
+
+def print_table(results):
+    header = "%-34s %-12s %7s %10s %12s %9s %9s %9s" % (
+        "class", "workload", "ops", "ops/s", "rows/s", "p50 ms", "p95 ms", "p99 ms")
+    print(header)
+    print("-" * len(header))
+    for item in results:
+        if "error" in item:
+            print("%-34s %-12s error: %s" % (item["class"], item["workload"], item["error"]))
+            continue
+        print("%-34s %-12s %7d %10.1f %12.1f %9.3f %9.3f %9.3f" % (
+            item["class"], item["workload"], item["ops"], item["ops_per_sec"], item["rows_per_sec"],
+            item["p50_ms"], item["p95_ms"], item["p99_ms"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="mysql / pg 驱动基准测试")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--user", default=None, help="默认 mysql 为 root，pg 为 postgres")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--db-name", default="bench")
+    parser.add_argument("--mysql-port", type=int, default=3306)
+    parser.add_argument("--pg-port", type=int, default=5432)
+    parser.add_argument("--skip-mysql", action="store_true")
+    parser.add_argument("--skip-pg", action="store_true")
+    parser.add_argument("--only", default="", help="只测这些驱动，逗号分隔，如 pymysql,asyncpg")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="逗号分隔")
+    parser.add_argument("--scale", type=float, default=1.0, help="各负载次数的倍数")
+    parser.add_argument("--warmup", type=int, default=5, help="每个负载正式计时前的预热次数")
+    parser.add_argument("--json", dest="json_path", default=None, help="结果另存为 JSON，便于对比回归")
+    args = parser.parse_args(argv)
+
+    iterations = {name: max(1, int(WORKLOADS[name] * args.scale)) for name in args.workloads.split(",") if name}
+    only = set(filter(None, args.only.split(",")))
+    families = []
+    if not args.skip_mysql:
+        families.append((MYSQL_CLASSES, setup_mysql, dict(host=args.host, user=args.user or "root",
+                                                          password=args.password, port=args.mysql_port,
+                                                          db_name=args.db_name)))
+    if not args.skip_pg:
+        families.append((PG_CLASSES, setup_pg, dict(host=args.host, user=args.user or "postgres",
+                                                     password=args.password, port=args.pg_port,
+                                                     db_name=args.db_name)))
+
+    results = []
+    for classes, setup, params in families:
+        classes = [c for c in classes if not only or c[0] in only]
+        if not classes:
+            continue
+        if not setup(params):
+            print("skip %s: no driver available for setup" % setup.__name__[6:], file=sys.stderr)
+            continue
+        for driver, module, name in classes:
+            try:
+                rows = bench_class(driver, module, name, params, iterations, args.warmup)
+            except Exception as e:
+                # 单个类出错不中断其余类，错误记入结果
+                print("fail %s.%s: %r" % (module, name, e), file=sys.stderr)
+                rows = [{"workload": "-", "error": "%s: %s" % (type(e).__name__, e)}]
+            for item in rows or ():
+                item["class"] = "%s.%s" % (module, name)
+                item["driver"] = driver
+                results.append(item)
+
+    print_table(results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : __init__.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# 各驱动模块共用的工具，只依赖标准库
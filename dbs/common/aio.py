@@ -0,0 +1,90 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : aio.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# 异步并发工具
+
+import asyncio
+
+
+async def gather(*aws):
+    """并发执行，按传入顺序返回结果；任一出错时取消其余任务，等其退出（归还连接）后抛出该异常"""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    if not tasks:
+        return []
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    errors = [task.exception() for task in tasks if task.done() and not task.cancelled()]
+    for error in errors:
+        if error is not None:
+            raise error
+    return [task.result() for task in tasks]
+
+
+async def map_concurrent(func, args_iter, concurrency, ordered=False):
+    """
+    最多 concurrency 个并发调用 func(args)，边执行边 async yield (args, 结果)
+    :param args_iter: 参数的可迭代对象或异步可迭代对象，按需读取，不会一次生成全部任务
+    :param ordered: True 按输入顺序 yield，否则按完成顺序；按顺序时先完成的结果暂存，
+        暂存与执行中的合计不超过 concurrency（最多暂存 concurrency - 1 个），暂存占满时不启动新任务
+    任一调用出错或调用方提前结束时，取消未完成的任务并等其退出
+    """
+    if hasattr(args_iter, "__aiter__"):
+        source = args_iter.__aiter__()
+
+        async def take():
+            try:
+                return True, await source.__anext__()
+            except StopAsyncIteration:
+                return False, None
+    else:
+        source = iter(args_iter)
+
+        async def take():
+            try:
+                return True, next(source)
+            except StopIteration:
+                return False, None
+
+    running = {}  # task -> (序号, args)
+    finished = {}  # ordered 时暂存：序号 -> (args, 结果)
+    started = emitted = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(running) + len(finished) < concurrency:
+                ok, args = await take()
+                if not ok:
+                    exhausted = True
+                    break
+                running[asyncio.ensure_future(func(args))] = (started, args)
+                started += 1
+            if not running:
+                break
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, args = running.pop(task)
+                result = task.result()
+                if ordered:
+                    finished[index] = (args, result)
+                else:
+                    yield args, result
+            while emitted in finished:
+                yield finished.pop(emitted)
+                emitted += 1
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.wait(running)
@@ -0,0 +1,207 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : cache.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# 查询结果缓存：按 (方法, sql, 参数) 缓存，TTL 过期 + LRU 淘汰，写操作按表名失效
+# 用法：db = DB(..., cache=ResultCache(max_size=10000))，查询时传 cache_ttl 才走缓存
+#      db.query_all("SELECT * FROM region", cache_ttl=60)
+# 缓存的结果被多个调用方共用，取出后只读，不要修改
+
+import collections
+import functools
+import re
+import threading
+import time
+
+_IDENT = r"[`\"]?\w+[`\"]?(?:\.[`\"]?\w+[`\"]?)*"
+# 表名后可跟别名（可带 AS），别名不能是紧跟表名的关键字
+_KEYWORDS = ("WHERE|JOIN|INNER|LEFT|RIGHT|FULL|CROSS|NATURAL|STRAIGHT_JOIN|OUTER|ON|USING|SET|VALUES?|SELECT|"
+             "GROUP|ORDER|LIMIT|OFFSET|FETCH|HAVING|WINDOW|UNION|EXCEPT|INTERSECT|FOR|RETURNING|DEFAULT|"
+             "PARTITION|LATERAL|TABLESAMPLE|USE|FORCE|IGNORE|LOCK")
+_ITEM = r"{0}(?:\s+(?:AS\s+)?(?!(?:{1})\b)\w+)?".format(_IDENT, _KEYWORDS)
+_TABLE = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE|TRUNCATE(?:\s+TABLE)?(?:\s+ONLY)?|TABLE)\s+({0}(?:\s*,\s*{0})*)".format(_ITEM), re.IGNORECASE)
+_NAME = re.compile(r"^{}$".format(_IDENT))
+
+
+def tables_of(sql):
+    """
+    SQL 中涉及的表名（小写，去掉库名/模式名）；sql 本身是表名时直接返回
+    >>> sorted(tables_of("SELECT * FROM users u, orders AS o WHERE u.id = o.user_id"))
+    ['orders', 'users']
+    >>> sorted(tables_of("SELECT * FROM a x JOIN b ON x.id = b.id WHERE 1"))
+    ['a', 'b']
+    >>> sorted(tables_of("TRUNCATE t1")), sorted(tables_of("TRUNCATE TABLE db.t2"))
+    (['t1'], ['t2'])
+    """
+    sql = sql.strip()
+    names = [sql] if _NAME.match(sql) else [n.split()[0] for group in _TABLE.findall(sql) for n in group.split(",")]
+    return {n.split(".")[-1].strip("`\"").lower() for n in names}
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class ResultCache(object):
+    """
+    线程安全的查询结果缓存
+    :param max_size: 最多缓存条数，超出按 LRU 淘汰
+    :param ttl: 默认过期秒数，查询传 cache_ttl=True 时使用
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = collections.OrderedDict()  # key -> (过期时间, 表名, 结果)
+        self._tags = collections.defaultdict(set)  # 表名 -> key
+        self._versions = collections.defaultdict(int)  # 表名 -> 失效次数，防止查询期间的写入被旧结果覆盖
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(name, sql, args, kwargs):
+        return name, sql, _hashable(args), _hashable(kwargs)
+
+    def get(self, key):
+        """返回 (是否命中, 结果)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                if item[0] > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, item[2]
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def version(self, tables):
+        """查询前记下相关表的版本，set 时版本变了说明期间有写入，不缓存"""
+        with self._lock:
+            return tuple(self._versions[t] for t in tables)
+
+    def set(self, key, value, ttl=None, tables=(), version=None):
+        ttl = self.ttl if ttl is None or ttl is True else ttl
+        with self._lock:
+            if version is not None and version != tuple(self._versions[t] for t in tables):
+                return
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + ttl, tables, value)
+            for table in tables:
+                self._tags[table].add(key)
+            while len(self._data) > self.max_size:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, *tables):
+        """删除涉及这些表的缓存"""
+        with self._lock:
+            for table in tables:
+                table = table.lower()
+                self._versions[table] += 1
+                for key in list(self._tags.pop(table, ())):
+                    if key in self._data:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "invalidations": self.invalidations}
+
+    def _remove(self, key):
+        _, tables, _ = self._data.pop(key)
+        for table in tables:
+            keys = self._tags.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[table]
+
+
+def cached(method):
+    """同步查询方法装饰器：实例设置了 cache 且调用传入 cache_ttl 时读缓存"""
+
+    @functools.wraps(method)
+    def wrapper(self, sql, *args, cache_ttl=None, **kwargs):
+        cache = self.cache
+        if not cache_ttl or cache is None:
+            return method(self, sql, *args, **kwargs)
+        key = cache.make_key(method.__name__, sql, args, kwargs)
+        hit, value = cache.get(key)
+        if hit:
+            return value
+        tables = tables_of(sql)
+        version = cache.version(tables)
+        value = method(self, sql, *args, **kwargs)
+        cache.set(key, value, cache_ttl, tables, version)
+        return value
+
+    return wrapper
+
+
+def cached_async(method):
+    """异步查询方法装饰器，同 cached"""
+
+    @functools.wraps(method)
+    async def wrapper(self, sql, *args, cache_ttl=None, **kwargs):
+        cache = self.cache
+        if not cache_ttl or cache is None:
+            return await method(self, sql, *args, **kwargs)
+        key = cache.make_key(method.__name__, sql, args, kwargs)
+        hit, value = cache.get(key)
+        if hit:
+            return value
+        tables = tables_of(sql)
+        version = cache.version(tables)
+        value = await method(self, sql, *args, **kwargs)
+        cache.set(key, value, cache_ttl, tables, version)
+        return value
+
+    return wrapper
+
+
+def invalidates(method):
+    """同步写方法装饰器：执行成功后删除 sql（或表名参数）涉及表的缓存"""
+
+    @functools.wraps(method)
+    def wrapper(self, sql, *args, **kwargs):
+        value = method(self, sql, *args, **kwargs)
+        if self.cache is not None:
+            self.cache.invalidate(*tables_of(sql))
+        return value
+
+    return wrapper
+
+
+def invalidates_async(method):
+    """异步写方法装饰器，同 invalidates"""
+
+    @functools.wraps(method)
+    async def wrapper(self, sql, *args, **kwargs):
+        value = await method(self, sql, *args, **kwargs)
+        if self.cache is not None:
+            self.cache.invalidate(*tables_of(sql))
+        return value
+
+    return wrapper
@@ -0,0 +1,123 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : columnar.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# 列式结果：各驱动类的 query_columns，结果按列返回 NumPy 数组，需 pip install numpy
+# 游标每取一批元组行即按列转成数组，不为每行建 dict，也不保留整批行
+# - 整数列 int64（有 NULL 时 float64，NULL 为 nan），浮点 / Decimal 列 float64（Decimal 转 float 会损失精度）
+# - datetime 列 datetime64[us]，date 列 datetime64[D]，NULL 为 NaT；带时区的 datetime 保留为 object
+# - bool 列 bool（有 NULL 时 object），其余（字符串、bytes、json 等）object
+
+import datetime
+import decimal
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("query_columns requires numpy: pip install numpy") from None
+    return numpy
+
+
+def _kind(values):
+    """按第一个非 NULL 值判断列类型"""
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            return "bool"
+        if isinstance(value, int):
+            return "int"
+        if isinstance(value, (float, decimal.Decimal)):
+            return "float"
+        if isinstance(value, datetime.datetime):
+            return "datetime" if value.tzinfo is None else "object"
+        if isinstance(value, datetime.date):
+            return "date"
+        return "object"
+    return None
+
+
+def _chunk(np, values):
+    """一批同一列的值转为数组，全为 NULL 返回 None（合并时按整列类型填充）"""
+    kind = _kind(values)
+    if kind is None:
+        return None
+    has_null = None in values
+    try:
+        if kind == "int" and not has_null:
+            return np.array(values, dtype=np.int64)
+        if kind in ("int", "float"):
+            return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        if kind == "datetime":
+            return np.array(values, dtype="datetime64[us]")
+        if kind == "date":
+            return np.array(values, dtype="datetime64[D]")
+        if kind == "bool" and not has_null:
+            return np.array(values, dtype=np.bool_)
+    except (TypeError, ValueError, OverflowError):
+        pass  # 列内类型不一致或超出范围
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _null(np, dtype, size):
+    if dtype.kind == "f":
+        return np.full(size, np.nan, dtype=dtype)
+    if dtype.kind == "M":
+        return np.full(size, np.datetime64("NaT"), dtype=dtype)
+    return np.full(size, None, dtype=object)
+
+
+def _merge(np, chunks):
+    dtypes = [c.dtype for _, c in chunks if c is not None]
+    total = sum(size for size, _ in chunks)
+    if not dtypes:
+        return np.full(total, None, dtype=object)
+    kinds = set(d.kind for d in dtypes)
+    if "O" in kinds or ("M" in kinds and kinds != {"M"}):
+        dtype = np.dtype(object)
+    else:
+        dtype = np.result_type(*dtypes)
+    if len(dtypes) < len(chunks):  # 有整批为 NULL
+        if dtype.kind in "iu":
+            dtype = np.dtype(np.float64)
+        elif dtype.kind == "b":
+            dtype = np.dtype(object)
+    parts = [_null(np, dtype, size) if c is None else c.astype(dtype, copy=False) for size, c in chunks]
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+class ColumnBuilder(object):
+    """
+    按批收集游标元组行，最后合并为每列一个数组
+        builder = ColumnBuilder()
+        while batch := cursor.fetchmany(n): builder.add(batch)
+        columns = builder.build(names)
+    """
+
+    def __init__(self):
+        self.np = _numpy()
+        self.chunks = None
+
+    def add(self, rows):
+        """rows：一批元组行（或 asyncpg Record）"""
+        if not rows:
+            return
+        size = len(rows)
+        columns = list(zip(*rows))
+        if self.chunks is None:
+            self.chunks = [[] for _ in columns]
+        for chunks, values in zip(self.chunks, columns):
+            chunks.append((size, _chunk(self.np, list(values))))
+
+    def build(self, names):
+        """列名 -> 数组，按结果列顺序"""
+        if self.chunks is None:
+            return {name: self.np.empty(0, dtype=object) for name in names}
+        return {name: _merge(self.np, chunks) for name, chunks in zip(names, self.chunks)}
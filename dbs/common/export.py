@@ -0,0 +1,186 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : export.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# 导出：各驱动类的 export，查询结果按批写入文件，内存中只保留一批行，用于大表导出
+# - "csv"：带表头，NULL 为空串，bytes 为十六进制；pg 驱动（psycopg2 / pg8000 / asyncpg）由 COPY (...) TO STDOUT 直接写文件，值为 pg 文本格式
+# - "jsonl"：每行一个 JSON 对象；datetime / date / time 为 ISO 字符串，Decimal 为字符串（不损失精度），bytes 为十六进制
+# - "parquet"：需 pip install pyarrow，每批一个 row group；列类型由 schema 指定，不指定时按第一批推断
+#   （第一批全为 NULL 的列推断不出类型，之后出现值会报错，这时传 schema）
+# 导出出错时删除写了一半的文件
+
+import contextlib
+import csv
+import datetime
+import decimal
+import json
+import os
+import uuid
+
+FORMATS = ("csv", "jsonl", "parquet")
+_BINARY = (bytes, bytearray, memoryview)
+
+
+def check_format(format):
+    if format not in FORMATS:
+        raise ValueError("format must be one of %s, got %r" % (", ".join(FORMATS), format))
+    return format
+
+
+def discard(path):
+    """删除写了一半的导出文件"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@contextlib.contextmanager
+def open_copy(path):
+    """COPY ... TO STDOUT 直接写入的文本文件，出错时删除"""
+    try:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            yield f
+    except BaseException:
+        discard(path)
+        raise
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("export(format='parquet') requires pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, _BINARY):
+        return bytes(value).hex()
+    raise TypeError("Object of type %s is not JSON serializable" % type(value).__name__)
+
+
+class CsvWriter(object):
+    def __init__(self, path, columns, schema=None):
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        # bytes 列每批重新判断（前几批可能全为 NULL），只转换这些列
+        binary = [i for i, values in enumerate(zip(*rows)) if any(isinstance(v, _BINARY) for v in values)]
+        if binary:
+            rows = [self._hex(row, binary) for row in rows]
+        self.writer.writerows(rows)
+
+    @staticmethod
+    def _hex(row, binary):
+        row = list(row)
+        for i in binary:
+            if isinstance(row[i], _BINARY):
+                row[i] = bytes(row[i]).hex()
+        return row
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlWriter(object):
+    def __init__(self, path, columns, schema=None):
+        self.file = open(path, "w", encoding="utf-8")
+        self.columns = columns
+        self.encoder = json.JSONEncoder(ensure_ascii=False, default=_json_default)
+
+    def write(self, rows):
+        encode, columns = self.encoder.encode, self.columns
+        self.file.write("".join(encode(dict(zip(columns, row))) + "\n" for row in rows))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter(object):
+    """
+    :param schema: pyarrow.Schema 或 [(列名, pyarrow 类型)]，与结果列顺序一致；None 按第一批推断
+    """
+
+    def __init__(self, path, columns, schema=None):
+        self.pa = _pyarrow()
+        self.path = path
+        self.columns = columns
+        self.schema = None if schema is None else self.pa.schema(schema)
+        self.writer = None
+
+    def write(self, rows):
+        pa = self.pa
+        values = list(zip(*rows)) if rows else [()] * len(self.columns)
+        if self.schema is None:
+            arrays = [pa.array(v) for v in values]
+            self.schema = pa.schema([(name, a.type) for name, a in zip(self.columns, arrays)])
+        else:
+            arrays = [self._array(v, field) for v, field in zip(values, self.schema)]
+        if self.writer is None:
+            self.writer = pa.parquet.ParquetWriter(self.path, self.schema)
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def _array(self, values, field):
+        try:
+            return self.pa.array(values, type=field.type)
+        except (self.pa.ArrowInvalid, self.pa.ArrowTypeError) as e:
+            raise ValueError("parquet column %r does not fit type %s (inferred from the first batch "
+                             "unless schema is given): %s" % (field.name, field.type, e)) from None
+
+    def close(self):
+        if self.writer is None:  # 无结果行，只写表头（列类型为 null）
+            self.write([])
+        self.writer.close()
+
+
+_WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+class Exporter(object):
+    """
+    按批写入导出文件，第一次 write 时按列名创建文件（空批也会写表头）
+        with Exporter(path, "jsonl") as out:
+            while True:
+                batch = cursor.fetchmany(n)
+                out.write(batch, names)
+                if not batch: break
+    """
+
+    def __init__(self, path, format, schema=None):
+        self.path = path
+        self.format = check_format(format)
+        self.schema = schema  # 仅 parquet 使用，见 ParquetWriter
+        self.writer = None
+        self.rows = 0
+
+    def write(self, rows, columns):
+        """rows：一批元组行（或 asyncpg Record），columns：列名"""
+        if self.writer is None:
+            self.writer = _WRITERS[self.format](self.path, list(columns), self.schema)
+        if rows:
+            self.writer.write(rows)
+            self.rows += len(rows)
+
+    def __enter__(self):
+        if self.format == "parquet":
+            _pyarrow()  # 查询前检查依赖
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.writer is not None:
+                self.writer.close()
+        finally:
+            if exc_type is not None:
+                discard(self.path)
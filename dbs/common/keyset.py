@@ -0,0 +1,92 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : keyset.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# 键集（seek）分页：记住上一页最后一行的排序键，下一页查询 WHERE 键 > 上次值 ORDER BY 键 LIMIT n
+# 数据库只扫描所需的行，深页与第一页代价相同；scroll 分页需把前面所有行传到客户端再丢弃
+
+import base64
+import json
+import re
+
+_COLUMN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def encode_cursor(values):
+    """排序键值 -> 不透明游标字符串"""
+    raw = json.dumps(list(values), default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """游标字符串 -> 排序键值列表"""
+    try:
+        raw = base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode("ascii"))
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, TypeError):
+        raise ValueError("invalid keyset cursor: {!r}".format(cursor))
+    if not isinstance(values, list):
+        raise ValueError("invalid keyset cursor: {!r}".format(cursor))
+    return values
+
+
+def order_columns(order_by):
+    """排序键统一为列名元组，只允许普通列名，防止注入"""
+    columns = (order_by,) if isinstance(order_by, str) else tuple(order_by)
+    if not columns:
+        raise ValueError("keyset order_by is empty")
+    for col in columns:
+        if not _COLUMN.match(col):
+            raise ValueError("invalid keyset order_by column: {!r}".format(col))
+    return columns
+
+
+def keyset_sql(sql, args=None, order_by="id", after=None, count=10, desc=False):
+    """
+    将基础查询包装为键集分页查询，多取一行用于判断是否有下一页
+    :param sql: 基础查询，不含 ORDER BY / LIMIT；总会追加 LIMIT %s 参数，SQL 中的 % 需写成 %%（基础查询无参数也一样）
+    :param args: 基础查询参数，tuple / list
+    :param order_by: 排序列（结果列名），需唯一，可为元组如 ("created_at", "id")
+    :param after: 上一页返回的游标，None 为第一页
+    :param count: 每页条数
+    :param desc: 是否倒序
+    :return: (sql, args)
+    """
+    columns = order_columns(order_by)
+    args = list(args or ())
+
+    def param(value):
+        args.append(value)
+        return "%s"
+
+    where = ""
+    if after is not None:
+        values = decode_cursor(after)
+        if len(values) != len(columns):
+            raise ValueError("keyset cursor does not match order_by {}".format(columns))
+        keys = ", ".join("_k.{}".format(col) for col in columns)
+        marks = ", ".join(param(value) for value in values)
+        if len(columns) > 1:
+            keys, marks = "({})".format(keys), "({})".format(marks)
+        where = " WHERE {} {} {}".format(keys, "<" if desc else ">", marks)
+    order = ", ".join("_k.{}{}".format(col, " DESC" if desc else "") for col in columns)
+    limit = param(count + 1)
+    page_sql = "SELECT * FROM ({}) AS _k{} ORDER BY {} LIMIT {}".format(sql.strip().rstrip(";"), where, order, limit)
+    return page_sql, args
+
+
+def next_page(rows, order_by="id", count=10):
+    """
+    截取一页数据并生成下一页游标
+    :param rows: keyset_sql 查询结果（最多 count + 1 行，行可按列名取值）
+    :return: data, next_cursor（无下一页为 None）
+    """
+    rows = list(rows)
+    if len(rows) <= count:
+        return rows, None
+    rows = rows[:count]
+    last = rows[-1]
+    return rows, encode_cursor(last[col] for col in order_columns(order_by))
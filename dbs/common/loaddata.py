@@ -0,0 +1,77 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : loaddata.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# MySQL LOAD DATA LOCAL INFILE 批量导入：行先按 LOAD DATA 默认格式（制表符分隔，\N 为 NULL）写入临时文件
+# 文件按 CHARACTER SET binary 导入，str 以 utf-8 写入，bytes 原样写入，均不做字符集转换
+
+import contextlib
+import itertools
+import os
+import re
+import tempfile
+
+_ESCAPE = re.compile(rb"[\\\t\n\r\0]")
+_ESCAPE_MAP = {b"\\": b"\\\\", b"\t": b"\\t", b"\n": b"\\n", b"\r": b"\\r", b"\0": b"\\0"}
+
+
+def escape_value(value):
+    """单个值转为 LOAD DATA 文本格式的 bytes"""
+    if value is None:
+        return b"\\N"
+    if isinstance(value, bool):
+        return b"1" if value else b"0"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        raw = bytes(value)
+    else:
+        raw = str(value).encode("utf-8")
+    return _ESCAPE.sub(lambda m: _ESCAPE_MAP[m.group()], raw)
+
+
+def write_rows(fp, rows, page_size=10000):
+    """按页序列化并写入二进制文件，返回行数"""
+    rows = iter(rows)
+    total = 0
+    while True:
+        page = list(itertools.islice(rows, page_size))
+        if not page:
+            return total
+        fp.write(b"".join(b"\t".join(map(escape_value, row)) + b"\n" for row in page))
+        total += len(page)
+
+
+def dump_rows(rows, page_size=10000):
+    """rows 写入临时文件，返回文件路径，调用方负责删除"""
+    fd, path = tempfile.mkstemp(prefix="load_", suffix=".tsv")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            write_rows(fp, rows, page_size)
+    except Exception as e:
+        os.remove(path)
+        raise e
+    return path
+
+
+@contextlib.contextmanager
+def temp_file(rows, page_size=10000):
+    """rows 写入临时文件，yield 文件路径，结束后删除"""
+    path = dump_rows(rows, page_size)
+    try:
+        yield path
+    finally:
+        os.remove(path)
+
+
+def quote_name(name):
+    """表名 / 列名加反引号，支持 db.table"""
+    return ".".join("`{}`".format(part.replace("`", "``")) for part in name.split("."))
+
+
+def load_sql(table, columns):
+    """LOAD DATA 语句，文件路径用 %s 参数传入"""
+    return ("LOAD DATA LOCAL INFILE %s INTO TABLE {} CHARACTER SET binary "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({})").format(
+        quote_name(table), ", ".join(quote_name(col) for col in columns))
@@ -0,0 +1,257 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : metrics.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# 查询耗时统计：各驱动的查询 / 写方法经 instrumented 装饰器记录每次调用
+# - 回调：instrument.add_hook(before=f, after=g)，参数为 QueryEvent
+# - 慢查询日志：instrument.slow_threshold = 0.5（秒），超过时写 logging "dbs.slow_query"，默认关闭
+# - 耗时直方图：instrument.stats() 按 SQL 指纹返回次数、错误数、平均 / 最大 / p50 / p95 / p99 耗时
+# 方法内用 mark("acquire") / mark("execute") 标记阶段，得到取连接等待、执行、取数据三段耗时
+
+import bisect
+import contextvars
+import functools
+import logging
+import re
+import threading
+import time
+
+slow_logger = logging.getLogger("dbs.slow_query")
+
+_current = contextvars.ContextVar("dbs_query_event", default=None)
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%s|%\(\w+\)s|\$\d+|(?<!:):(?!:)\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+# 直方图桶上界（秒），最后一个桶为无穷大
+BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30, 60)
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """SQL 指纹：常量和占位符替换为 ?，IN 列表合并，空白压缩，同一类查询归为一组"""
+    sql = _STRING.sub("?", sql)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip().rstrip(";")
+
+
+class QueryEvent(object):
+    """一次调用的信息，耗时单位为秒"""
+
+    __slots__ = ("method", "sql", "fingerprint", "args_size", "rows", "error", "acquire_time", "execute_time",
+                 "fetch_time", "total_time", "_start", "_acquired", "_executed")
+
+    def __init__(self, method, sql, args_size):
+        self.method = method
+        self.sql = sql
+        self.fingerprint = fingerprint(sql) if sql else method
+        self.args_size = args_size
+        self.rows = None
+        self.error = None
+        self.acquire_time = 0.0
+        self.execute_time = 0.0
+        self.fetch_time = 0.0
+        self.total_time = 0.0
+        self._start = time.perf_counter()
+        self._acquired = None
+        self._executed = None
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        if phase == "acquire" and self._acquired is None:
+            self._acquired = now
+        elif phase == "execute" and self._executed is None:
+            self._executed = now
+
+    def finish(self, result=None, error=None):
+        end = time.perf_counter()
+        acquired = self._acquired or self._start
+        executed = self._executed or end
+        self.acquire_time = acquired - self._start
+        self.execute_time = executed - acquired
+        self.fetch_time = end - executed
+        self.total_time = end - self._start
+        self.error = error
+        self.rows = None if error is not None else _count_rows(result)
+
+
+class Histogram(object):
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds, error=False):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.errors += bool(error)
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """按桶估算分位数，返回所在桶的上界（最后一个桶返回最大值）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self):
+        return {"count": self.count, "errors": self.errors, "avg": self.total / self.count if self.count else 0.0,
+                "max": self.max, "p50": self.percentile(0.5), "p95": self.percentile(0.95),
+                "p99": self.percentile(0.99)}
+
+
+class Instrument(object):
+    """
+    调用统计和回调
+    :param slow_threshold: 慢查询阈值（秒），None 不记录
+    :param max_fingerprints: 最多统计的指纹数，超出的归入 "<other>"
+    """
+
+    def __init__(self, slow_threshold=None, max_fingerprints=1000):
+        self.slow_threshold = slow_threshold
+        self.max_fingerprints = max_fingerprints
+        self.before_hooks = []
+        self.after_hooks = []
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, before=None, after=None):
+        """before(event) 执行前调用，after(event) 执行后（含出错）调用"""
+        if before is not None:
+            self.before_hooks.append(before)
+        if after is not None:
+            self.after_hooks.append(after)
+
+    def remove_hook(self, before=None, after=None):
+        if before in self.before_hooks:
+            self.before_hooks.remove(before)
+        if after in self.after_hooks:
+            self.after_hooks.remove(after)
+
+    def begin(self, method, sql, args_size):
+        event = QueryEvent(method, sql, args_size)
+        for hook in self.before_hooks:
+            hook(event)
+        return event
+
+    def end(self, event, result=None, error=None):
+        event.finish(result, error)
+        with self._lock:
+            histogram = self._histograms.get(event.fingerprint)
+            if histogram is None:
+                key = event.fingerprint if len(self._histograms) < self.max_fingerprints else "<other>"
+                histogram = self._histograms.setdefault(key, Histogram())
+            histogram.add(event.total_time, error is not None)
+        if self.slow_threshold is not None and event.total_time >= self.slow_threshold:
+            slow_logger.warning("slow query %.3fs (acquire %.3fs, execute %.3fs, fetch %.3fs) rows=%s args=%s %s: %s",
+                                event.total_time, event.acquire_time, event.execute_time, event.fetch_time,
+                                event.rows, event.args_size, event.method, event.fingerprint)
+        for hook in self.after_hooks:
+            hook(event)
+
+    def stats(self):
+        """SQL 指纹 -> 耗时统计，按总耗时倒序"""
+        with self._lock:
+            items = [(fp, h.summary(), h.total) for fp, h in self._histograms.items()]
+        return {fp: summary for fp, summary, _ in sorted(items, key=lambda item: item[2], reverse=True)}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+instrument = Instrument()
+
+
+def mark(phase):
+    """标记当前调用进入下一阶段："acquire" 已取得连接，"execute" 执行完成开始取数据"""
+    event = _current.get()
+    if event is not None:
+        event.mark(phase)
+
+
+def _count_rows(result):
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+        result = result[0]  # (data, size) / (data, next_cursor)
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return 1
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return None
+
+
+def _describe(args, kwargs):
+    """从调用参数中取 SQL（第一个字符串参数，存储过程名 / 表名亦可）和参数个数"""
+    sql, rest = None, ()
+    for i, arg in enumerate(args):
+        if isinstance(arg, str):
+            sql, rest = arg, args[i + 1:]
+            break
+    params = kwargs.get("args", rest[0] if rest else None)
+    if isinstance(params, (list, tuple, dict)):
+        size = len(params)
+    elif params is None:
+        size = 0
+    else:
+        size = len(rest)
+    return sql, size
+
+
+def instrumented(method):
+    """同步方法装饰器，记录耗时并调用回调"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        sql, size = _describe(args, kwargs)
+        event = instrument.begin(method.__name__, sql, size)
+        token = _current.set(event)
+        try:
+            result = method(self, *args, **kwargs)
+        except Exception as e:
+            _current.reset(token)
+            instrument.end(event, error=e)
+            raise e
+        _current.reset(token)
+        instrument.end(event, result)
+        return result
+
+    return wrapper
+
+
+def instrumented_async(method):
+    """异步方法装饰器，同 instrumented"""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        sql, size = _describe(args, kwargs)
+        event = instrument.begin(method.__name__, sql, size)
+        token = _current.set(event)
+        try:
+            result = await method(self, *args, **kwargs)
+        except Exception as e:
+            _current.reset(token)
+            instrument.end(event, error=e)
+            raise e
+        _current.reset(token)
+        instrument.end(event, result)
+        return result
+
+    return wrapper
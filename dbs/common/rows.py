@@ -0,0 +1,112 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : rows.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# 行格式：各驱动类的 row_format 参数，决定 query_one / query_all / query_many / query_size_data 每行的类型
+# - "dict"：默认，列名 -> 值
+# - "tuple"：驱动取回的元组，不再转换，最省内存
+# - "namedtuple"：collections.namedtuple，可按列名或下标访问
+# - "slots"：带 __slots__ 的记录类，按属性访问，比 dict 省内存
+# asyncpg 另支持 "record" / "mapping"，见 dbs.pg.aio.asyncpg_db
+# namedtuple / slots 的类按列名组合生成一次后缓存；列名不是合法标识符时改为 col_0, col_1 ...（按位置）
+
+import collections
+import functools
+import keyword
+
+ROW_FORMATS = ("dict", "tuple", "namedtuple", "slots")
+
+
+def check_format(row_format, allowed=ROW_FORMATS):
+    if row_format not in allowed:
+        raise ValueError("row_format must be one of %s, got %r" % (", ".join(allowed), row_format))
+    return row_format
+
+
+def columns_of(description):
+    """DB-API cursor.description -> 列名元组"""
+    return tuple(d[0] for d in description)
+
+
+class SlotsRecord(object):
+    """slots 行格式的基类，子类由 record_class 按列名生成"""
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __getitem__(self, index):
+        return getattr(self, self.__slots__[index])
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__,
+                           ", ".join("%s=%r" % (name, getattr(self, name)) for name in self.__slots__))
+
+    def _asdict(self):
+        return dict(zip(self.__slots__, self))
+
+
+def _field_names(columns):
+    names, seen = [], set()
+    for i, name in enumerate(columns):
+        if not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_") or name in seen:
+            name = "col_%d" % i
+        seen.add(name)
+        names.append(name)
+    return tuple(names)
+
+
+@functools.lru_cache(maxsize=256)
+def record_class(columns, row_format):
+    """按列名生成 namedtuple / slots 行类，同一列名组合只生成一次"""
+    fields = _field_names(columns)
+    if row_format == "namedtuple":
+        return collections.namedtuple("Row", fields)
+    return type("Record", (SlotsRecord,), {"__slots__": fields})
+
+
+def make_rows(rows, columns, row_format):
+    """元组行（或 asyncpg Record 等可迭代行）列表转为 row_format"""
+    if row_format == "dict":
+        return [dict(zip(columns, row)) for row in rows]
+    if row_format == "tuple":
+        return list(map(tuple, rows))
+    cls = record_class(columns, row_format)
+    if row_format == "namedtuple":
+        return list(map(cls._make, rows))
+    return [cls(*row) for row in rows]
+
+
+def make_row(row, columns, row_format):
+    """单行转为 row_format，None 原样返回"""
+    if row is None:
+        return None
+    return make_rows((row,), columns, row_format)[0]
+
+
+def convert(cursor, data, row_format):
+    """DB-API 游标（返回元组行）fetchall / fetchmany 的结果转为 row_format"""
+    return make_rows(data, columns_of(cursor.description), row_format)
+
+
+def convert_one(cursor, row, row_format):
+    """DB-API 游标 fetchone 的结果转为 row_format"""
+    if row is None:
+        return None
+    return make_row(row, columns_of(cursor.description), row_format)
@@ -0,0 +1,8 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : __init__.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# mysql 驱动封装：sync（pymysql / mysqlclient）、aio（aiomysql），按需导入具体模块
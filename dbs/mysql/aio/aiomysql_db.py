@@ -0,0 +1,993 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : aiomysql_db.py
+# @Date    : 2021-04-27
+# @Author  : ls
+
+# api中sql语句多，可使用一个连接，将conn连接放每个方法参数，执行完再关闭
+# MySQLDBPool 共用一个连接池，async with MySQLDBPool(...) as db 或 start()/close() 管理生命周期
+# MySQLDBPool 存储过程方法的 pool 参数传 None 即使用共用连接池
+# MySQLDBPool 传 replicas 时读写分离：query_* 走从库，写 / 存储过程 / get_cur 走主库
+
+import asyncio
+import contextvars
+import itertools
+import os
+
+import aiomysql
+
+from dbs.common import aio, keyset, loaddata, metrics
+from dbs.common.cache import cached_async, invalidates_async
+from dbs.common.columnar import ColumnBuilder
+from dbs.common.export import Exporter
+from dbs.common.rows import check_format, columns_of, convert, convert_one
+
+
+class DBInit(object):
+
+    def __init__(self, host="localhost", user="root", password="", port=3306, db_name="", local_infile=False, cache=None,
+                 row_format="dict"):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+        self.db_name = db_name
+        self.charset = "utf8mb4"
+        self.local_infile = local_infile  # bulk_load 需开启
+        self.cache = cache  # dbs.common.cache.ResultCache，查询传 cache_ttl 时使用
+        # query_one / query_all / query_many / query_size_data 的行格式，见 dbs.common.rows
+        self.row_format = check_format(row_format)
+        self._row_cursor = aiomysql.DictCursor if row_format == "dict" else aiomysql.Cursor
+        # self.pool = self.get_pool()
+
+
+class MySQLDB(DBInit):
+
+    async def get_connection(self):
+        try:
+            conn = await aiomysql.connect(host=self.host, user=self.user, password=self.password, port=self.port,
+                                          db=self.db_name, charset=self.charset, local_infile=self.local_infile)
+        except Exception as e:
+            raise e
+        metrics.mark("acquire")
+        return conn
+
+    @metrics.instrumented_async
+    async def query_one(self, sql, args=None):
+        conn = await self.get_connection()
+        try:
+            async with conn.cursor(self._row_cursor) as cur:
+                await cur.execute(sql, args)
+                metrics.mark("execute")
+                # print(cur.description)
+                data = await cur.fetchone()
+                if self.row_format != "dict":
+                    data = convert_one(cur, data, self.row_format)
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return data
+
+    @metrics.instrumented_async
+    async def query_many(self, sql, args=None, page=1, count=10):
+        """分页查询  SQL加 SQL_CALC_FOUND_ROWS"""
+        conn = await self.get_connection()
+        try:
+            async with conn.cursor(self._row_cursor) as cur:
+                await cur.execute(sql, args)
+                metrics.mark("execute")
+                await cur.scroll((page - 1) * count)
+                data = await cur.fetchmany(count)
+                if self.row_format != "dict":
+                    data = convert(cur, data, self.row_format)
+                size = cur.rowcount
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return data, size
+
+    @metrics.instrumented_async
+    async def query_keyset(self, sql, args=None, order_by="id", after=None, count=10, desc=False):
+        """
+        键集分页，深页与第一页代价相同，大表翻页替代 query_many
+        :param sql: 基础查询，不含 ORDER BY / LIMIT
+        :param order_by: 排序列（结果列名），需唯一，可为元组如 ("created_at", "id")
+        :param after: 上一页返回的 next_cursor，None 为第一页
+        :return: data, next_cursor（无下一页为 None）
+        """
+        page_sql, page_args = keyset.keyset_sql(sql, args, order_by, after, count, desc)
+        conn = await self.get_connection()
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(page_sql, page_args)
+                metrics.mark("execute")
+                data = await cur.fetchall()
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return keyset.next_page(data, order_by, count)
+
+    @metrics.instrumented_async
+    async def query_all(self, sql, args=None):
+        """查询所有"""
+        conn = await self.get_connection()
+        try:
+            async with conn.cursor(self._row_cursor) as cur:
+                await cur.execute(sql, args)
+                metrics.mark("execute")
+                data = await cur.fetchall()
+                if self.row_format != "dict":
+                    data = convert(cur, data, self.row_format)
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return data
+
+    @metrics.instrumented_async
+    async def query_columns(self, sql, args=None, batch_size=10000):
+        """
+        列式查询，返回 {列名: NumPy 数组}，用于统计分析，需 pip install numpy
+        服务端游标每次取 batch_size 行直接按列转换，不建每行 dict，列类型见 dbs.common.columnar
+        """
+        builder = ColumnBuilder()
+        conn = await self.get_connection()
+        try:
+            async with conn.cursor(aiomysql.SSCursor) as cur:
+                await cur.execute(sql, args)
+                metrics.mark("execute")
+                while True:
+                    data = await cur.fetchmany(batch_size)
+                    if not data:
+                        break
+                    builder.add(data)
+                names = columns_of(cur.description)
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return builder.build(names)
+
+    @metrics.instrumented_async
+    async def export(self, sql, args, path, format="csv", batch_size=10000, schema=None):
+        """
+        导出查询结果到文件，服务端游标每次取 batch_size 行写入，内存中只保留一批，用于大表导出
+        :param path: 输出文件路径
+        :param format: "csv" / "jsonl" / "parquet"（需 pip install pyarrow），见 dbs.common.export
+        :param batch_size: 每批行数
+        :param schema: parquet 列类型（pyarrow.Schema 或 [(列名, 类型)]），默认按第一批推断
+        :return: 导出行数
+        """
+        conn = await self.get_connection()
+        try:
+            with Exporter(path, format, schema) as out:
+                async with conn.cursor(aiomysql.SSCursor) as cur:
+                    await cur.execute(sql, args)
+                    metrics.mark("execute")
+                    while True:
+                        data = await cur.fetchmany(batch_size)
+                        out.write(data, columns_of(cur.description))
+                        if not data:
+                            break
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return out.rows
+
+    @metrics.instrumented_async
+    async def query_size_data(self, sql, args=None):
+        """查询并返回总数 SQL加 SQL_CALC_FOUND_ROWS"""
+        conn = await self.get_connection()
+        try:
+            async with conn.cursor(self._row_cursor) as cur:
+                await cur.execute(sql, args)
+                metrics.mark("execute")
+                data = await cur.fetchall()
+                if self.row_format != "dict":
+                    data = convert(cur, data, self.row_format)
+                size = cur.rowcount
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return data, size
+
+    @metrics.instrumented_async
+    async def insert(self, sql, args=None):
+        """插入数据"""
+        conn = await self.get_connection()
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                data = await cur.execute(sql, args)
+        except Exception as e:
+            await conn.rollback()
+            conn.close()
+            raise e
+        await conn.commit()
+        conn.close()
+        return data
+
+    @metrics.instrumented_async
+    async def insert_get_id(self, sql, args=None):
+        """插入数据并返回自增id"""
+        conn = await self.get_connection()
+        try:
+            # await conn.begin()  # 好像并不起作用
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(sql, args)
+                last_id = cur.lastrowid  # id自增
+        except Exception as e:
+            await conn.rollback()
+            conn.close()
+            raise e
+        await conn.commit()
+        conn.close()
+        return last_id
+
+    @metrics.instrumented_async
+    async def insert_many(self, sql, args=None):
+        """
+        批量插入
+        :param sql:
+        :param args: tuple list [(),()]
+        :return:
+        """
+        conn = await self.get_connection()
+        try:
+            # await conn.begin()
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                data = await cur.executemany(sql, args)
+        except Exception as e:
+            await conn.rollback()
+            conn.close()
+            raise e
+        await conn.commit()
+        conn.close()
+        return data
+
+    @metrics.instrumented_async
+    async def bulk_load(self, table, columns, rows):
+        """
+        LOAD DATA LOCAL INFILE 批量导入，比 insert_many 快一个数量级
+        需 local_infile=True 且服务端开启 local_infile
+        :param table: 表名，可带库名 db.table
+        :param columns: 列名 list，与每行顺序一致
+        :param rows: tuple 的可迭代对象，逐页写入临时文件后导入；None 为 NULL，bytes 原样导入
+        :return: 导入行数
+        """
+        # 写临时文件放到线程池，不阻塞事件循环
+        path = await asyncio.get_event_loop().run_in_executor(None, loaddata.dump_rows, rows)
+        try:
+            conn = await self.get_connection()
+            try:
+                async with conn.cursor() as cur:
+                    data = await cur.execute(loaddata.load_sql(table, columns), (path,))
+            except Exception as e:
+                await conn.rollback()
+                conn.close()
+                raise e
+            await conn.commit()
+            conn.close()
+        finally:
+            os.remove(path)
+        return data
+
+    @metrics.instrumented_async
+    async def execute(self, sql, args=None):
+        """执行操作。可作为更新和删除"""
+        conn = await self.get_connection()
+        try:
+            # await conn.begin()
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                data = await cur.execute(sql, args)
+        except Exception as e:
+            await conn.rollback()
+            conn.close()
+            raise e
+        await conn.commit()
+        conn.close()
+        return data
+
+    @metrics.instrumented_async
+    async def execute_many(self, sql, args=None):
+        """
+        批量执操作。可作为更新和删除
+        :param sql:
+        :param args: tuple list [(),()]
+        :return:
+        """
+        conn = await self.get_connection()
+        try:
+            # await conn.begin()
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                data = await cur.executemany(sql, args)
+        except Exception as e:
+            await conn.rollback()
+            conn.close()
+            raise e
+        await conn.commit()
+        conn.close()
+        return data
+
+    @metrics.instrumented_async
+    async def execute_procedure(self, conn, sql):
+        """执行存储过程"""
+        # conn = await self.get_connection()
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(sql)
+        except Exception as e:
+            await conn.rollback()
+            raise e
+        # conn.close()
+        return True
+
+    @metrics.instrumented_async
+    async def call_procedure(self, conn, procname, args=()):
+        """调用写存储过程"""
+        # conn = await self.get_connection()
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                data = await cursor.callproc(procname, args)
+        except Exception as e:
+            await conn.rollback()
+            raise e
+        await conn.commit()
+        # conn.close()
+        return data
+
+    @metrics.instrumented_async
+    async def fetchone_procedure(self, conn, procname, args=()):
+        """调用查询存储过程"""
+        # conn = await self.get_connection()
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.callproc(procname, args)
+                metrics.mark("execute")
+                data = await cursor.fetchone()
+        except Exception as e:
+            await conn.rollback()
+            raise e
+        # conn.close()
+        return data
+
+    @metrics.instrumented_async
+    async def fetchmany_procedure(self, conn, procname, args=(), page=1, count=10):
+        """调用查询存储过程"""
+        # conn = await self.get_connection()
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.callproc(procname, args)
+                metrics.mark("execute")
+                await cursor.scroll((page - 1) * count)
+                data = await cursor.fetchmany(count)
+                size = cursor.rowcount
+        except Exception as e:
+            await conn.rollback()
+            raise e
+        # conn.close()
+        return data, size
+
+    @metrics.instrumented_async
+    async def fetchall_procedure(self, conn, procname, args=()):
+        """调用查询存储过程"""
+        # conn = await self.get_connection()
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.callproc(procname, args)
+                metrics.mark("execute")
+                data = await cursor.fetchall()
+                size = cursor.rowcount
+        except Exception as e:
+            await conn.rollback()
+            raise e
+        # conn.close()
+        return data, size
+
+    async def get_cur(self):
+        """
+        事务操作，数据异常需要conn.rollback()
+        查询需手动fetchone() 或 fetchall() 及rollback()
+        """
+        conn = await self.get_connection()
+        # await conn.begin()
+        try:
+            cur = await conn.cursor(aiomysql.DictCursor)
+        except Exception as e:
+            raise e
+        return conn, cur
+
+    @staticmethod
+    async def close_conn(conn, cur):
+        # 关闭游标
+        await cur.close()
+        # 关闭连接
+        await conn.commit()
+        # 释放连接
+        conn.close()
+
+
+class MySQLDBPool(DBInit):
+
+    def __init__(self, host="localhost", user="root", password="", port=3306, db_name="", min_conn=10, max_conn=100,
+                 pool_recycle=3600, local_infile=False, cache=None, replicas=None, replica_strategy="round_robin",
+                 row_format="dict"):
+        super(MySQLDBPool, self).__init__(host, user, password, port, db_name, local_infile, cache, row_format)
+        self.min_conn = min_conn
+        self.max_conn = max_conn
+        self.pool_recycle = pool_recycle  # 连接最大存活秒数，避免被 MySQL wait_timeout 断开，-1 不回收
+        self.pool = None  # 整个生命周期共用一个连接池，start() 时创建
+        self._pool_lock = None
+        # 从库，如 [{"host": "10.0.0.2"}, {"host": "10.0.0.3", "port": 3307}]，未写的 user / password 同主库
+        self.replicas = list(replicas or [])
+        # 从库选择："round_robin" 轮询，"least_in_flight" 选使用中连接最少的
+        self.replica_strategy = replica_strategy
+        self.replica_pools = []
+        self._replica_turn = itertools.count()
+        # 当前请求（asyncio 任务）写过主库后，之后的读也走主库，避免读不到刚写入的数据
+        self._sticky = contextvars.ContextVar("mysql_sticky_primary_{}".format(id(self)), default=False)
+
+    async def get_connection_pool(self, **endpoint):
+        """新建一个独立的连接池，调用方负责关闭；endpoint 可覆盖 host / port / user / password"""
+        params = dict(host=self.host, user=self.user, password=self.password, port=self.port)
+        params.update(endpoint)
+        try:
+            # autocommit：读查询不留未结束的事务（不占锁、不读旧快照）；写操作显式 begin() / commit()
+            pool = await aiomysql.create_pool(db=self.db_name, minsize=self.min_conn, maxsize=self.max_conn,
+                                              charset=self.charset, pool_recycle=self.pool_recycle,
+                                              local_infile=self.local_infile, autocommit=True, **params)
+        except Exception as e:
+            raise e
+        return pool
+
+    async def start(self):
+        """创建（首次调用时）并返回共用连接池"""
+        if self.pool is not None:
+            return self.pool
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self.pool is None:
+                pools = []
+                try:
+                    for endpoint in [{}] + self.replicas:  # 主库 + 从库
+                        pools.append(await self.get_connection_pool(**endpoint))
+                except Exception as e:
+                    for pool in pools:
+                        await self.close_pool(pool)
+                    raise e
+                self.pool, self.replica_pools = pools[0], pools[1:]
+        return self.pool
+
+    async def close(self):
+        """关闭共用连接池（含从库）"""
+        pools = [self.pool] + self.replica_pools if self.pool is not None else []
+        self.pool, self.replica_pools = None, []
+        for pool in pools:
+            pool.close()
+        for pool in pools:
+            await pool.wait_closed()
+
+    async def _read_pool(self):
+        """读操作的连接池：无从库或当前请求已写过时用主库，否则按策略选从库"""
+        pool = await self.start()
+        if not self.replica_pools or self._sticky.get():
+            return pool
+        if self.replica_strategy == "least_in_flight":
+            return min(self.replica_pools, key=lambda p: p.size - p.freesize)
+        return self.replica_pools[next(self._replica_turn) % len(self.replica_pools)]
+
+    async def _write_pool(self):
+        """写操作、存储过程、事务走主库，并标记当前请求之后的读也走主库"""
+        pool = await self.start()
+        if self.replica_pools:
+            self._sticky.set(True)
+        return pool
+
+    def reset_sticky(self):
+        """取消当前请求的主库粘滞，之后的读重新走从库"""
+        self._sticky.set(False)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @cached_async
+    @metrics.instrumented_async
+    async def query_one(self, sql, args=None):
+        pool = await self._read_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(self._row_cursor) as cur:
+                try:
+                    await cur.execute(sql, args)
+                    metrics.mark("execute")
+                    # print(cur.description)
+                    data = await cur.fetchone()
+                    if self.row_format != "dict":
+                        data = convert_one(cur, data, self.row_format)
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+        return data
+
+    @metrics.instrumented_async
+    async def query_many(self, sql, args=None, page=1, count=10):
+        """分页查询  SQL_CALC_FOUND_ROWS"""
+        pool = await self._read_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(self._row_cursor) as cur:
+                try:
+                    await cur.execute(sql, args)
+                    metrics.mark("execute")
+                    # print(cur.description)
+                    await cur.scroll((page - 1) * count)
+                    data = await cur.fetchmany(count)
+                    if self.row_format != "dict":
+                        data = convert(cur, data, self.row_format)
+                    size = cur.rowcount
+                    # await cur.execute("SELECT FOUND_ROWS() as count;")
+                    # count = cur.fetchall()
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+        # return data, count.result()[0].get("count")
+        return data, size
+
+    @metrics.instrumented_async
+    async def query_keyset(self, sql, args=None, order_by="id", after=None, count=10, desc=False):
+        """
+        键集分页，深页与第一页代价相同，大表翻页替代 query_many
+        :param sql: 基础查询，不含 ORDER BY / LIMIT
+        :param order_by: 排序列（结果列名），需唯一，可为元组如 ("created_at", "id")
+        :param after: 上一页返回的 next_cursor，None 为第一页
+        :return: data, next_cursor（无下一页为 None）
+        """
+        page_sql, page_args = keyset.keyset_sql(sql, args, order_by, after, count, desc)
+        pool = await self._read_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                try:
+                    await cur.execute(page_sql, page_args)
+                    metrics.mark("execute")
+                    data = await cur.fetchall()
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+        return keyset.next_page(data, order_by, count)
+
+    @cached_async
+    @metrics.instrumented_async
+    async def query_all(self, sql, args=None):
+        """查询所有"""
+        pool = await self._read_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(self._row_cursor) as cur:
+                try:
+                    await cur.execute(sql, args)
+                    metrics.mark("execute")
+                    data = await cur.fetchall()
+                    if self.row_format != "dict":
+                        data = convert(cur, data, self.row_format)
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+        return data
+
+    @metrics.instrumented_async
+    async def query_columns(self, sql, args=None, batch_size=10000):
+        """
+        列式查询，返回 {列名: NumPy 数组}，用于统计分析，需 pip install numpy
+        服务端游标每次取 batch_size 行直接按列转换，不建每行 dict，列类型见 dbs.common.columnar
+        """
+        builder = ColumnBuilder()
+        pool = await self._read_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(aiomysql.SSCursor) as cur:
+                try:
+                    await cur.execute(sql, args)
+                    metrics.mark("execute")
+                    while True:
+                        data = await cur.fetchmany(batch_size)
+                        if not data:
+                            break
+                        builder.add(data)
+                    names = columns_of(cur.description)
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+        return builder.build(names)
+
+    @metrics.instrumented_async
+    async def export(self, sql, args, path, format="csv", batch_size=10000, schema=None):
+        """
+        导出查询结果到文件，服务端游标每次取 batch_size 行写入，内存中只保留一批，用于大表导出
+        :param path: 输出文件路径
+        :param format: "csv" / "jsonl" / "parquet"（需 pip install pyarrow），见 dbs.common.export
+        :param batch_size: 每批行数
+        :param schema: parquet 列类型（pyarrow.Schema 或 [(列名, 类型)]），默认按第一批推断
+        :return: 导出行数
+        """
+        pool = await self._read_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(aiomysql.SSCursor) as cur:
+                try:
+                    with Exporter(path, format, schema) as out:
+                        await cur.execute(sql, args)
+                        metrics.mark("execute")
+                        while True:
+                            data = await cur.fetchmany(batch_size)
+                            out.write(data, columns_of(cur.description))
+                            if not data:
+                                break
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+        return out.rows
+
+    @metrics.instrumented_async
+    async def query_size_data(self, sql, args=None):
+        """查询并返回总数，sql语句需加 SQL_CALC_FOUND_ROWS"""
+        pool = await self._read_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(self._row_cursor) as cur:
+                try:
+                    await cur.execute(sql, args)
+                    metrics.mark("execute")
+                    data = await cur.fetchall()
+                    if self.row_format != "dict":
+                        data = convert(cur, data, self.row_format)
+                    size = cur.rowcount
+                    # await cur.execute("SELECT FOUND_ROWS() as count;")
+                    # count = cur.fetchall()
+                    # print(count.result()[0].get("count"))
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+        # return data, count.result()[0].get("count")
+        return data, size
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def insert(self, sql, args=None):
+        """插入一条"""
+        pool = await self._write_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            await conn.begin()
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                try:
+                    res = await cur.execute(sql, args)
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+                if not res:
+                    await conn.rollback()
+                    # return
+                    raise aiomysql.DatabaseError("SQL Insert nothing")
+                await conn.commit()
+        return res
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def insert_get_id(self, sql, args=None):
+        """插入一条[，返回自增id]"""
+        pool = await self._write_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            await conn.begin()
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                try:
+                    res = await cur.execute(sql, args)
+                    last_id = cur.lastrowid  # id自增
+                    # await cur.execute("SELECT LAST_INSERT_ID() as last_insert_id;")  # 自增id
+                    # last_id_info = await cur.fetchone()
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+                if not res:
+                    await conn.rollback()
+                    # return
+                    raise aiomysql.DatabaseError("SQL Insert nothing")
+                await conn.commit()
+        # return last_id_info.get("last_insert_id")
+        return last_id
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def insert_many(self, sql, args=None):
+        pool = await self._write_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            await conn.begin()
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                try:
+                    data = await cur.executemany(sql, args)
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+                await conn.commit()
+                if not data:
+                    await conn.rollback()
+                    raise
+        return data
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def bulk_load(self, table, columns, rows):
+        """
+        LOAD DATA LOCAL INFILE 批量导入，比 insert_many 快一个数量级
+        需 local_infile=True 且服务端开启 local_infile
+        :param table: 表名，可带库名 db.table
+        :param columns: 列名 list，与每行顺序一致
+        :param rows: tuple 的可迭代对象，逐页写入临时文件后导入；None 为 NULL，bytes 原样导入
+        :return: 导入行数
+        """
+        # 写临时文件放到线程池，不阻塞事件循环
+        path = await asyncio.get_event_loop().run_in_executor(None, loaddata.dump_rows, rows)
+        try:
+            pool = await self._write_pool()
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                await conn.begin()
+                async with conn.cursor() as cur:
+                    try:
+                        data = await cur.execute(loaddata.load_sql(table, columns), (path,))
+                    except Exception as e:
+                        await conn.rollback()
+                        raise e
+                    await conn.commit()
+        finally:
+            os.remove(path)
+        return data
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def execute(self, sql, args=None):
+        """数据库更新（无删除操作）"""
+        pool = await self._write_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            await conn.begin()
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                try:
+                    data = await cur.execute(sql, args)
+                except Exception as e:
+                    # logger.error("DB Update Error：{}".format(e))
+                    await conn.rollback()
+                    raise e
+                await conn.commit()
+                # if data == 0:
+                #     await conn.rollback()
+                #     raise
+        return data
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def execute_many(self, sql, args=None):
+        """批量执行更新删除操作，args 为空时不执行"""
+        pool = await self._write_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            await conn.begin()
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                try:
+                    data = await cur.executemany(sql, args)
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+                await conn.commit()
+        return data
+
+    async def map_concurrent(self, sql, args_iter, concurrency=None, ordered=False, fetch="all"):
+        """
+        同一条 SQL 按多组参数并发执行，边执行边 async yield (args, 结果)
+        async for args, rows in db.map_concurrent("SELECT * FROM t1 WHERE user_id=%s", ((i,) for i in ids)):
+        :param args_iter: 参数的可迭代对象或异步可迭代对象，按需读取
+        :param concurrency: 并发数，默认且最大为连接池大小 max_conn
+        :param ordered: True 按输入顺序返回，否则按完成顺序
+        :param fetch: "one" / "all" / "execute"，对应 query_one / query_all / execute
+        任一出错时取消其余未完成的查询并抛出异常
+        提前 break 时用 async with contextlib.aclosing(db.map_concurrent(...)) as results 包裹，退出即取消其余查询
+        """
+        method = {"one": self.query_one, "all": self.query_all, "execute": self.execute}[fetch]
+        concurrency = min(concurrency or self.max_conn, self.max_conn)
+        await self.start()
+        results = aio.map_concurrent(lambda args: method(sql, args), args_iter, concurrency, ordered)
+        try:
+            async for item in results:
+                yield item
+        finally:
+            # 本生成器关闭时立即关闭内层，取消未完成的查询、归还连接，不等垃圾回收
+            await results.aclose()
+
+    @metrics.instrumented_async
+    async def execute_procedure(self, pool, sql):
+        """执行存储过程"""
+        if pool is None:
+            pool = await self._write_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                try:
+                    await cursor.execute(sql)
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+        return True
+
+    @metrics.instrumented_async
+    async def call_procedure(self, pool, procname, args=()):
+        """
+        调用写存储过程
+        返回和参数一致
+        """
+        if pool is None:
+            pool = await self._write_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            await conn.begin()
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                try:
+                    data = await cursor.callproc(procname, args)
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+                await conn.commit()
+        return data
+
+    @metrics.instrumented_async
+    async def fetchone_procedure(self, pool, procname, args=()):
+        """调用one查询存储过程"""
+        if pool is None:
+            pool = await self._write_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                try:
+                    await cursor.callproc(procname, args)
+                    metrics.mark("execute")
+                    data = await cursor.fetchone()
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+                await conn.commit()
+        return data
+
+    @metrics.instrumented_async
+    async def fetchmany_procedure(self, pool, procname, args=(), page=1, count=10):
+        """调用many查询存储过程"""
+        if pool is None:
+            pool = await self._write_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                try:
+                    await cursor.callproc(procname, args)
+                    metrics.mark("execute")
+                    await cursor.scroll((page - 1) * count)
+                    data = await cursor.fetchmany(count)
+                    size = cursor.rowcount
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+        return data, size
+
+    @metrics.instrumented_async
+    async def fetchall_procedure(self, pool, procname, args=()):
+        """调用all查询存储过程"""
+        if pool is None:
+            pool = await self._write_pool()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                try:
+                    await cursor.callproc(procname, args)
+                    metrics.mark("execute")
+                    data = await cursor.fetchall()
+                    # size = cursor.rowcount
+                except Exception as e:
+                    await conn.rollback()
+                    raise e
+        return data
+
+    async def get_cur(self):
+        """
+        事务操作，数据异常需要conn.rollback()
+        查询需手动fetchone() 或 fetchall() 及rollback()
+        """
+        pool = await self._write_pool()
+        conn = await pool.acquire()
+        await conn.begin()
+        cur = await conn.cursor(aiomysql.DictCursor)
+        return pool, conn, cur
+
+    @staticmethod
+    async def close_pool(pool):
+        pool.close()
+        await pool.wait_closed()
+
+    async def close_pool_conn(self, pool, conn, cur):
+        # 关闭游标
+        await cur.close()
+        # 关闭连接
+        await conn.commit()
+        # 释放连接
+        pool.release(conn)
+        # 共用连接池不关闭，由 close() 统一关闭
+        if pool is not self.pool:
+            pool.close()
+            await pool.wait_closed()
+
+
+if __name__ == '__main__':
+
+    async def t():
+        # db = MySQLDB(password="123456", db_name="test")
+        # 读写分离：MySQLDBPool(password="123456", db_name="test", replicas=[{"host": "10.0.0.2"}])
+        async with MySQLDBPool(password="123456", db_name="test") as db:
+            return await run(db)
+
+    async def run(db):
+        # pool = await db.start()
+        # pool, conn, cur = await db.get_cur()
+        # res = None
+        # try:
+        #     res = await cur.execute("UPDATE t1 SET name='呵呵' WHERE id=1;")
+        # except Exception as e:
+        #     print(e)
+        #     await conn.rollback()
+        #     # logger.error(e)
+        #     # return "not ok"
+        # await db.close_pool_conn(pool, conn, cur)
+        # res = await db.query_one("SELECT * FROM t1;")
+        # res = await db.query_many("SELECT * FROM t1;", page=1, count=3)
+        # res = await db.query_all("SELECT * FROM t1;")
+        # res, s = await db.query_size_data("SELECT * FROM t1;")
+        res = await db.insert("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", (1, "ha"))
+        # res = await db.insert_get_id("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", (1, "had"))
+        # res = await db.insert_many("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", [(1, "hh"), (2, "aaa")])
+        # res = await db.execute("UPDATE t1 SET name='呵呵' WHERE id=1;")
+        # sql = """CREATE PROCEDURE select_one(pk int)
+        #          BEGIN
+        #             SELECT * FROM t1 WHERE user_id=pk;
+        #          END"""
+        # sql = """CREATE PROCEDURE insert_one(user_id int, name varchar(4) )
+        #          BEGIN
+        #             INSERT INTO t1 (user_id, name) VALUES (user_id, name);
+        #          END"""
+        # sql = """CREATE PROCEDURE update_one(user_id int, name varchar(4), pk int)
+        #                  BEGIN
+        #                     UPDATE t1 SET user_id=user_id, name=name WHERE id=pk;
+        #                  END"""
+        # sql = """CREATE PROCEDURE delete_one(pk int)
+        #                  BEGIN
+        #                     DELETE FROM t1 WHERE id=pk;
+        #                  END"""
+        # conn = await db.get_connection()
+        # await db.execute_procedure(conn, sql)
+        # res,s = await db.fetchall_procedure(conn, "select_one", (2,))
+        # res = await db.call_procedure(conn, "insert_one", (4, "vv"))
+        # res = await db.call_procedure(conn, "update_one", (4, "v4", 121))
+        # res = await db.call_procedure(conn, "delete_one", (2,))
+        # conn.close()
+
+        return res
+
+
+    loop = asyncio.get_event_loop()
+    print(loop.run_until_complete(t()))
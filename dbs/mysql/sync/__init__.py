@@ -0,0 +1,8 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : __init__.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# 同步驱动：pymysql_db（推荐，gevent 可用）、mysqldb_db（需 pip install mysqlclient）
@@ -0,0 +1,425 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : mysqldb_db.py
+# @Date    : 2021-04-27
+# @Author  : ls
+
+# pip install mysqlclient
+
+import contextlib
+
+import MySQLdb
+from MySQLdb.cursors import Cursor, DictCursor, SSCursor, SSDictCursor
+
+from dbs.common import keyset, loaddata, metrics
+from dbs.common.cache import cached, invalidates
+from dbs.common.columnar import ColumnBuilder
+from dbs.common.export import Exporter
+from dbs.common.rows import check_format, columns_of, convert, convert_one
+
+
+class DB(object):
+    def __init__(self, host="localhost", user="root", password="", port=3306, db_name="", cursorclass=None, autocommit=True,
+                 local_infile=False, cache=None, row_format="dict"):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+        self.db_name = db_name
+        self.charset = "utf8mb4"
+        self.cursorclass = cursorclass  # MySQLdb.cursors.DictCursor
+        self.autocommit = autocommit
+        self.local_infile = local_infile  # bulk_load 需开启
+        self.cache = cache  # dbs.common.cache.ResultCache，查询传 cache_ttl 时使用
+        # query_one / query_all / query_many / query_size_data 的行格式，见 dbs.common.rows
+        self.row_format = check_format(row_format)
+        self._row_cursor = None if row_format == "dict" else Cursor
+        self.conn = self.get_connection()
+
+    def get_connection(self):
+        try:
+            conn = MySQLdb.connect(host=self.host, port=self.port, user=self.user, passwd=self.password, database=self.db_name,
+                                   charset=self.charset, cursorclass=DictCursor, autocommit=self.autocommit,
+                                   local_infile=int(self.local_infile))
+        except Exception as e:
+            raise e
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        实例共用一个连接，已关闭时重新连接；成功提交，异常回滚
+        不用 with self.conn：MySQLdb 退出 with 时会关闭连接，实例第二次调用即失败
+        """
+        if self.conn is None:
+            self.conn = self.get_connection()
+        conn = self.conn
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def close(self):
+        """关闭连接，可重复调用；之后再调用方法会重新连接"""
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            conn.close()
+
+    @cached
+    @metrics.instrumented
+    def query_one(self, sql, args=None):
+        try:
+            with self.connection() as conn:
+                with conn.cursor(self._row_cursor) as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    data = cursor.fetchone()
+                    if self.row_format != "dict":
+                        data = convert_one(cursor, data, self.row_format)
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def query_many(self, sql, args=None, page=1, count=10):
+        """分页查询，SQL 加 SQL_CALC_FOUND_ROWS"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor(self._row_cursor) as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    cursor.scroll((page - 1) * count)
+                    data = cursor.fetchmany(count)
+                    if self.row_format != "dict":
+                        data = convert(cursor, data, self.row_format)
+                    size = cursor.rowcount
+        except Exception as e:
+            raise e
+        return list(data), size
+
+    @metrics.instrumented
+    def query_keyset(self, sql, args=None, order_by="id", after=None, count=10, desc=False):
+        """
+        键集分页，深页与第一页代价相同，大表翻页替代 query_many
+        :param sql: 基础查询，不含 ORDER BY / LIMIT
+        :param order_by: 排序列（结果列名），需唯一，可为元组如 ("created_at", "id")
+        :param after: 上一页返回的 next_cursor，None 为第一页
+        :return: data, next_cursor（无下一页为 None）
+        """
+        page_sql, page_args = keyset.keyset_sql(sql, args, order_by, after, count, desc)
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(page_sql, page_args)
+                    metrics.mark("execute")
+                    data = cursor.fetchall()
+        except Exception as e:
+            raise e
+        return keyset.next_page(data, order_by, count)
+
+    @cached
+    @metrics.instrumented
+    def query_all(self, sql, args=None):
+        try:
+            with self.connection() as conn:
+                with conn.cursor(self._row_cursor) as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    data = cursor.fetchall()
+                    if self.row_format != "dict":
+                        data = convert(cursor, data, self.row_format)
+        except Exception as e:
+            raise e
+        return list(data)
+
+    @metrics.instrumented
+    def query_size_data(self, sql, args=None):
+        """查询并返回总数 SQL加 SQL_CALC_FOUND_ROWS"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor(self._row_cursor) as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    data = cursor.fetchall()
+                    if self.row_format != "dict":
+                        data = convert(cursor, data, self.row_format)
+                    size = cursor.rowcount
+        except Exception as e:
+            raise e
+        return list(data), size
+
+    @metrics.instrumented
+    def query_columns(self, sql, args=None, batch_size=10000):
+        """
+        列式查询，返回 {列名: NumPy 数组}，用于统计分析，需 pip install numpy
+        服务端游标每次取 batch_size 行直接按列转换，不建每行 dict，列类型见 dbs.common.columnar
+        """
+        builder = ColumnBuilder()
+        try:
+            with self.connection() as conn:
+                with conn.cursor(SSCursor) as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    while True:
+                        data = cursor.fetchmany(batch_size)
+                        if not data:
+                            break
+                        builder.add(data)
+                    names = columns_of(cursor.description)
+        except Exception as e:
+            raise e
+        return builder.build(names)
+
+    @metrics.instrumented
+    def export(self, sql, args, path, format="csv", batch_size=10000, schema=None):
+        """
+        导出查询结果到文件，服务端游标每次取 batch_size 行写入，内存中只保留一批，用于大表导出
+        :param path: 输出文件路径
+        :param format: "csv" / "jsonl" / "parquet"（需 pip install pyarrow），见 dbs.common.export
+        :param batch_size: 每批行数
+        :param schema: parquet 列类型（pyarrow.Schema 或 [(列名, 类型)]），默认按第一批推断
+        :return: 导出行数
+        """
+        try:
+            with Exporter(path, format, schema) as out:
+                with self.connection() as conn:
+                    with conn.cursor(SSCursor) as cursor:
+                        cursor.execute(sql, args)
+                        metrics.mark("execute")
+                        while True:
+                            data = cursor.fetchmany(batch_size)
+                            out.write(data, columns_of(cursor.description))
+                            if not data:
+                                break
+        except Exception as e:
+            raise e
+        return out.rows
+
+    def stream(self, sql, args=None, batch_size=1000, batch=False, as_dict=True):
+        """
+        流式查询，服务端（无缓冲）游标逐批读取，内存占用与结果集大小无关，用于大表导出
+        :param batch_size: 每批行数
+        :param batch: True 时每次 yield 一批 list，否则逐行 yield
+        :param as_dict: False 时行为 tuple，更省内存
+        读取期间占用一个连接；提前结束（break / close()）时直接关闭该连接，服务端随之中止查询
+        """
+        if self.conn is None:
+            self.conn = self.get_connection()
+        conn = self.conn
+        cursor = conn.cursor(SSDictCursor if as_dict else SSCursor)
+        finished = False
+        try:
+            cursor.execute(sql, args)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if batch:
+                    yield list(rows)
+                else:
+                    yield from rows
+            finished = True
+        finally:
+            if finished:
+                cursor.close()
+            else:
+                # 未读完时先关闭连接，不必把剩余结果读完；下次调用重新连接
+                if self.conn is conn:
+                    self.conn = None
+                conn.close()
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+
+    @invalidates
+    @metrics.instrumented
+    def insert(self, sql, args=None):
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    data = cursor.execute(sql, args)
+        except Exception as e:
+            raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def insert_get_id(self, sql, args=None):
+        """插入数据并返回自增id"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql, args)
+                    data = cursor.lastrowid
+        except Exception as e:
+            raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def insert_many(self, sql, args=None):
+        """批量插入"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    data = cursor.executemany(sql, args)
+        except Exception as e:
+            raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def bulk_load(self, table, columns, rows):
+        """
+        LOAD DATA LOCAL INFILE 批量导入，比 insert_many 快一个数量级
+        需 local_infile=True 且服务端开启 local_infile
+        :param table: 表名，可带库名 db.table
+        :param columns: 列名 list，与每行顺序一致
+        :param rows: tuple 的可迭代对象，逐页写入临时文件后导入；None 为 NULL，bytes 原样导入
+        :return: 导入行数
+        """
+        with loaddata.temp_file(rows) as path:
+            try:
+                with self.connection() as conn:
+                    with conn.cursor() as cursor:
+                        data = cursor.execute(loaddata.load_sql(table, columns), (path,))
+            except Exception as e:
+                raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def execute(self, sql, args=None):
+        """执行更新删除操作"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    data = cursor.execute(sql, args)
+        except Exception as e:
+            raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def execute_many(self, sql, args=None):
+        """批量执行更新删除操作"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    data = cursor.executemany(sql, args)
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def execute_procedure(self, sql):
+        """执行存储过程"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql)
+        except Exception as e:
+            raise e
+        return True
+
+    @metrics.instrumented
+    def call_procedure(self, procname, args=()):
+        """
+        调用写存储过程
+        返回和参数一致
+        """
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    data = cursor.callproc(procname, args)
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def fetchone_procedure(self, procname, args=()):
+        """调用查询存储过程"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.callproc(procname, args)
+                    metrics.mark("execute")
+                    data = cursor.fetchone()
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def fetchmany_procedure(self, procname, args=(), page=1, count=10):
+        """调用查询存储过程"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.callproc(procname, args)
+                    metrics.mark("execute")
+                    cursor.scroll((page - 1) * count)
+                    data = cursor.fetchmany(count)
+                    size = cursor.rowcount
+        except Exception as e:
+            raise e
+        return data, size
+
+    @metrics.instrumented
+    def fetchall_procedure(self, procname, args=()):
+        """调用查询存储过程"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.callproc(procname, args)
+                    metrics.mark("execute")
+                    data = cursor.fetchall()
+                    # size = cursor.rowcount
+        except Exception as e:
+            raise e
+        return data
+
+    def get_cur(self):
+        """
+        事务操作
+        查询需手动fetch，错误rollback
+        """
+        if self.conn is None:
+            self.conn = self.get_connection()
+        try:
+            cur = self.conn.cursor()
+        except Exception as e:
+            raise e
+        return cur
+
+    def close_conn(self, cur):
+        self.conn.commit()
+        cur.close()
+        self.close()
+
+
+if __name__ == '__main__':
+    db = DB(password="123456", db_name="test")
+    # r = db.query_one("SELECT * FROM t1 WHERE id=%s;", (1,))
+    # r, s = db.query_many("SELECT SQL_CALC_FOUND_ROWS * FROM t1;", page=2, count=3)
+    # r = db.query_all("SELECT * FROM t1 WHERE user_id=%s;", (1,))
+    # r, s = db.query_size_data("SELECT SQL_CALC_FOUND_ROWS * FROM t1 WHERE user_id=%s;", (1,))
+    # for rows in db.stream("SELECT * FROM t1;", batch_size=5000, batch=True):
+    #     print(len(rows))
+    # r = db.insert("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", (1, "yaay"))
+    # r = db.insert_get_id("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", (1, "ya"))
+    # r = db.insert_many("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", [(2, "yaf"), (2, "ya")])
+    # r = db.execute_many("UPDATE t1 SET name=%s WHERE id=%s;", [("haha", 101), ("hehe", 102)])
+    cur = None
+    try:
+        cur = db.get_cur()
+    except Exception as e:
+        print(e)
+        raise
+    r = cur.executemany("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", [(2, "yaf1"), (2, "yea")])
+    db.close_conn(cur)
+    print(r)
+    # print(r, s)
@@ -0,0 +1,575 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : pymysql_db.py
+# @Date    : 2021-04-27
+# @Author  : ls
+
+# DB 内部使用有界连接池，可在多线程 / gevent 协程间共用一个实例
+# gevent 需先 monkey.patch_all()，连接池的锁和等待随之变为协程安全
+
+import collections
+import contextlib
+import threading
+import time
+
+import pymysql.cursors
+
+from dbs.common import keyset, loaddata, metrics
+from dbs.common.cache import cached, invalidates
+from dbs.common.columnar import ColumnBuilder
+from dbs.common.export import Exporter
+from dbs.common.rows import check_format, columns_of, convert, convert_one
+
+
+class ConnectionPool(object):
+    """
+    有界同步连接池
+    :param creator: 创建新连接的函数
+    :param max_size: 最大连接数
+    :param timeout: 取连接的最长等待秒数
+    :param ping: 取出时 ping 一次，断开的连接直接丢弃重建
+    :param max_lifetime: 连接最大存活秒数，超过则关闭重建，None 不限
+    :param max_idle: 空闲超过该秒数的连接会被关闭回收，None 不回收
+    """
+
+    def __init__(self, creator, max_size=32, timeout=10, ping=True, max_lifetime=3600, max_idle=300):
+        self.creator = creator
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping = ping
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self._idle = collections.deque()  # (conn, 创建时间, 归还时间)，右端为最近归还
+        self._created = {}  # 借出中的连接 -> 创建时间
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """取一个可用连接，池满时最多等待 timeout 秒"""
+        deadline = time.monotonic() + self.timeout
+        stale = []
+        try:
+            with self._cond:
+                while True:
+                    stale.extend(self._reap_idle())
+                    if self._idle:
+                        conn, created, _ = self._idle.pop()  # 优先用最近归还的连接
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn, created = None, None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise pymysql.err.OperationalError(
+                            "get connection from pool timeout ({}s)".format(self.timeout))
+                    self._cond.wait(remaining)
+        finally:
+            self._close_all(stale)
+        if conn is not None and not self._usable(conn, created):
+            self._close_all([conn])
+            conn = None
+        if conn is None:
+            try:
+                conn = self.creator()
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise e
+            created = time.monotonic()
+        with self._cond:
+            self._created[conn] = created
+        return conn
+
+    def release(self, conn, discard=False):
+        """归还连接，discard 或连接已断开时直接关闭"""
+        with self._cond:
+            created = self._created.pop(conn, None)
+            if created is None:
+                return
+            if discard or not conn.open:
+                self._size -= 1
+            else:
+                self._idle.append((conn, created, time.monotonic()))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._close_all([conn])
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._cond:
+            idle = [item[0] for item in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def _usable(self, conn, created):
+        if self.max_lifetime is not None and time.monotonic() - created > self.max_lifetime:
+            return False
+        if self.ping:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def _reap_idle(self):
+        """持锁调用，移出空闲过久的连接，返回待关闭的连接"""
+        stale = []
+        if self.max_idle is None:
+            return stale
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][2] > self.max_idle:
+            stale.append(self._idle.popleft()[0])
+            self._size -= 1
+        return stale
+
+    @staticmethod
+    def _close_all(conns):
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class DB(object):
+    def __init__(self, host="localhost", user="root", password="", port=3306, db_name="", cursorclass=None,
+                 autocommit=False, max_conn=32, pool_timeout=10, ping=True, max_lifetime=3600, max_idle=300,
+                 local_infile=False, cache=None, row_format="dict"):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+        self.db_name = db_name
+        self.charset = "utf8mb4"
+        self.cursorclass = cursorclass or pymysql.cursors.DictCursor
+        self.autocommit = autocommit
+        self.local_infile = local_infile  # bulk_load 需开启
+        self.cache = cache  # dbs.common.cache.ResultCache，查询传 cache_ttl 时使用
+        # query_one / query_all / query_many / query_size_data 的行格式，见 dbs.common.rows
+        self.row_format = check_format(row_format)
+        self._row_cursor = None if row_format == "dict" else pymysql.cursors.Cursor
+        self.pool = ConnectionPool(self.get_connection, max_size=max_conn, timeout=pool_timeout, ping=ping,
+                                   max_lifetime=max_lifetime, max_idle=max_idle)
+
+    def get_connection(self):
+        try:
+            conn = pymysql.connect(host=self.host, user=self.user, password=self.password, database=self.db_name,
+                                   port=self.port, charset=self.charset, cursorclass=self.cursorclass,
+                                   autocommit=self.autocommit, local_infile=self.local_infile)
+        except Exception as e:
+            raise e
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """从连接池取一个连接，正常结束提交，异常回滚，用完归还"""
+        conn = self.pool.acquire()
+        metrics.mark("acquire")
+        broken = False
+        try:
+            yield conn
+            if not self.autocommit:
+                conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.pool.release(conn, discard=broken)
+
+    def close(self):
+        """关闭连接池"""
+        self.pool.close()
+
+    @cached
+    @metrics.instrumented
+    def query_one(self, sql, args=None):
+        try:
+            with self.connection() as conn:
+                with conn.cursor(self._row_cursor) as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    data = cursor.fetchone()
+                    if self.row_format != "dict":
+                        data = convert_one(cursor, data, self.row_format)
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def query_many(self, sql, args=None, page=1, count=10):
+        """分页查询，SQL 加 SQL_CALC_FOUND_ROWS"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor(self._row_cursor) as cursor:
+                    real_sql = cursor.mogrify(sql, args)  # 将sql字符串组合成一句真正的sql
+                    cursor.execute(real_sql)
+                    metrics.mark("execute")
+                    cursor.scroll((page - 1) * count)
+                    data = cursor.fetchmany(count)
+                    if self.row_format != "dict":
+                        data = convert(cursor, data, self.row_format)
+                    size = cursor.rowcount
+        except Exception as e:
+            raise e
+        return data, size
+
+    @metrics.instrumented
+    def query_keyset(self, sql, args=None, order_by="id", after=None, count=10, desc=False):
+        """
+        键集分页，深页与第一页代价相同，大表翻页替代 query_many
+        :param sql: 基础查询，不含 ORDER BY / LIMIT
+        :param order_by: 排序列（结果列名），需唯一，可为元组如 ("created_at", "id")
+        :param after: 上一页返回的 next_cursor，None 为第一页
+        :return: data, next_cursor（无下一页为 None）
+        """
+        page_sql, page_args = keyset.keyset_sql(sql, args, order_by, after, count, desc)
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(page_sql, page_args)
+                    metrics.mark("execute")
+                    data = cursor.fetchall()
+        except Exception as e:
+            raise e
+        return keyset.next_page(data, order_by, count)
+
+    @cached
+    @metrics.instrumented
+    def query_all(self, sql, args=None):
+        try:
+            with self.connection() as conn:
+                with conn.cursor(self._row_cursor) as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    data = cursor.fetchall()
+                    if self.row_format != "dict":
+                        data = convert(cursor, data, self.row_format)
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def query_size_data(self, sql, args=None):
+        """查询并返回总数 SQL加 SQL_CALC_FOUND_ROWS"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor(self._row_cursor) as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    data = cursor.fetchall()
+                    if self.row_format != "dict":
+                        data = convert(cursor, data, self.row_format)
+                    size = cursor.rowcount
+        except Exception as e:
+            raise e
+        return data, size
+
+    @metrics.instrumented
+    def query_columns(self, sql, args=None, batch_size=10000):
+        """
+        列式查询，返回 {列名: NumPy 数组}，用于统计分析，需 pip install numpy
+        服务端游标每次取 batch_size 行直接按列转换，不建每行 dict，列类型见 dbs.common.columnar
+        """
+        builder = ColumnBuilder()
+        try:
+            with self.connection() as conn:
+                with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    while True:
+                        data = cursor.fetchmany(batch_size)
+                        if not data:
+                            break
+                        builder.add(data)
+                    names = columns_of(cursor.description)
+        except Exception as e:
+            raise e
+        return builder.build(names)
+
+    @metrics.instrumented
+    def export(self, sql, args, path, format="csv", batch_size=10000, schema=None):
+        """
+        导出查询结果到文件，服务端游标每次取 batch_size 行写入，内存中只保留一批，用于大表导出
+        :param path: 输出文件路径
+        :param format: "csv" / "jsonl" / "parquet"（需 pip install pyarrow），见 dbs.common.export
+        :param batch_size: 每批行数
+        :param schema: parquet 列类型（pyarrow.Schema 或 [(列名, 类型)]），默认按第一批推断
+        :return: 导出行数
+        """
+        try:
+            with Exporter(path, format, schema) as out:
+                with self.connection() as conn:
+                    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+                        cursor.execute(sql, args)
+                        metrics.mark("execute")
+                        while True:
+                            data = cursor.fetchmany(batch_size)
+                            out.write(data, columns_of(cursor.description))
+                            if not data:
+                                break
+        except Exception as e:
+            raise e
+        return out.rows
+
+    def stream(self, sql, args=None, batch_size=1000, batch=False, as_dict=True):
+        """
+        流式查询，服务端（无缓冲）游标逐批读取，内存占用与结果集大小无关，用于大表导出
+        :param batch_size: 每批行数
+        :param batch: True 时每次 yield 一批 list，否则逐行 yield
+        :param as_dict: False 时行为 tuple，更省内存
+        读取期间占用一个连接；提前结束（break / close()）时直接关闭该连接，服务端随之中止查询
+        """
+        cursorclass = pymysql.cursors.SSDictCursor if as_dict else pymysql.cursors.SSCursor
+        conn = self.pool.acquire()
+        finished = False
+        try:
+            cursor = conn.cursor(cursorclass)
+            cursor.execute(sql, args)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if batch:
+                    yield rows
+                else:
+                    yield from rows
+            cursor.close()
+            if not self.autocommit:
+                conn.commit()  # 结束读事务，连接归还时不带未结束的事务
+            finished = True
+        finally:
+            # 未读完时丢弃连接，不必把剩余结果读完
+            self.pool.release(conn, discard=not finished)
+
+    @invalidates
+    @metrics.instrumented
+    def insert(self, sql, args=None):
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    data = cursor.execute(sql, args)
+        except Exception as e:
+            raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def insert_get_id(self, sql, args=None):
+        """插入数据并返回自增id"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql, args)
+                    data = cursor.lastrowid
+        except Exception as e:
+            raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def insert_many(self, sql, args=None):
+        """批量插入"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.executemany(sql, args)
+        except Exception as e:
+            raise e
+        return True
+
+    @invalidates
+    @metrics.instrumented
+    def bulk_load(self, table, columns, rows):
+        """
+        LOAD DATA LOCAL INFILE 批量导入，比 insert_many 快一个数量级
+        需 local_infile=True 且服务端开启 local_infile
+        :param table: 表名，可带库名 db.table
+        :param columns: 列名 list，与每行顺序一致
+        :param rows: tuple 的可迭代对象，逐页写入临时文件后导入；None 为 NULL，bytes 原样导入
+        :return: 导入行数
+        """
+        with loaddata.temp_file(rows) as path:
+            try:
+                with self.connection() as conn:
+                    with conn.cursor() as cursor:
+                        data = cursor.execute(loaddata.load_sql(table, columns), (path,))
+            except Exception as e:
+                raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def execute(self, sql, args=None):
+        """执行更新删除操作"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    data = cursor.execute(sql, args)
+        except Exception as e:
+            raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def execute_many(self, sql, args=None):
+        """批量执行更新删除操作"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    data = cursor.executemany(sql, args)
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def execute_procedure(self, sql):
+        """执行存储过程"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql)
+        except Exception as e:
+            raise e
+        return True
+
+    @metrics.instrumented
+    def call_procedure(self, procname, args=()):
+        """
+        调用写存储过程
+        返回和参数一致
+        """
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    data = cursor.callproc(procname, args)
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def fetchone_procedure(self, procname, args=()):
+        """调用查询存储过程"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.callproc(procname, args)
+                    metrics.mark("execute")
+                    data = cursor.fetchone()
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def fetchmany_procedure(self, procname, args=(), page=1, count=10):
+        """调用查询存储过程"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.callproc(procname, args)
+                    metrics.mark("execute")
+                    cursor.scroll((page - 1) * count)
+                    data = cursor.fetchmany(count)
+                    size = cursor.rowcount
+        except Exception as e:
+            raise e
+        return data, size
+
+    @metrics.instrumented
+    def fetchall_procedure(self, procname, args=()):
+        """调用查询存储过程"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.callproc(procname, args)
+                    metrics.mark("execute")
+                    data = cursor.fetchall()
+                    # size = cursor.rowcount
+        except Exception as e:
+            raise e
+        return data
+
+    def get_cur(self):
+        """
+        事务操作，从连接池取出一个连接并开始事务（与 autocommit 无关）
+        查询需手动fetch，完成后 close_conn(cur) 提交并归还连接，出错时 rollback_conn(cur) 回滚并归还
+        也可用 with db.transaction() as cur，自动提交 / 回滚
+        """
+        conn = self.pool.acquire()
+        try:
+            conn.begin()
+            cur = conn.cursor()
+        except Exception as e:
+            self.pool.release(conn, discard=True)
+            raise e
+        return cur
+
+    def close_conn(self, cur):
+        conn = cur.connection
+        try:
+            conn.commit()
+            cur.close()
+        except Exception as e:
+            self.pool.release(conn, discard=True)
+            raise e
+        self.pool.release(conn)
+
+    def rollback_conn(self, cur):
+        """回滚 get_cur 开始的事务并归还连接，回滚失败时丢弃连接"""
+        conn = cur.connection
+        try:
+            conn.rollback()
+            cur.close()
+        except Exception:
+            self.pool.release(conn, discard=True)
+            return
+        self.pool.release(conn)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """with db.transaction() as cur：正常结束提交，异常回滚，连接总会归还"""
+        cur = self.get_cur()
+        try:
+            yield cur
+        except Exception:
+            self.rollback_conn(cur)
+            raise
+        self.close_conn(cur)
+
+
+if __name__ == '__main__':
+    db = DB(password="123456", db_name="test")
+    # r = db.query_one("SELECT * FROM t1 WHERE id=%s;", (1,))
+    # r, s = db.query_many("SELECT SQL_CALC_FOUND_ROWS * FROM t1;", page=2, count=3)
+    # r, next_cursor = db.query_keyset("SELECT * FROM t1 WHERE user_id=%s", (1,), order_by="id", count=3)
+    # r, next_cursor = db.query_keyset("SELECT * FROM t1 WHERE user_id=%s", (1,), order_by="id", after=next_cursor, count=3)
+    # r = db.query_all("SELECT * FROM t1 WHERE user_id=%s;", (1,))
+    # db = DB(password="123456", db_name="test", cache=ResultCache(max_size=10000))
+    # r = db.query_all("SELECT * FROM t1 WHERE user_id=%s;", (1,), cache_ttl=60)
+    # r, s = db.query_size_data("SELECT SQL_CALC_FOUND_ROWS * FROM t1 WHERE user_id=%s;", (1,))
+    # for rows in db.stream("SELECT * FROM t1;", batch_size=5000, batch=True):
+    #     print(len(rows))
+    # r = db.insert("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", (1, "ya"))
+    # r = db.insert_get_id("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", (1, "ya"))
+    # r = db.insert_many("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", [(2, "yaf"), (2, "ya")])
+    # r = db.execute_many("UPDATE t1 SET name=%s WHERE id=%s;", [("haha", 86), ("hehe", 87)])
+    # with db.transaction() as cur:
+    #     r = cur.executemany("INSERT INTO t1 (user_id, name) VALUES (%s, %s);", [(2, "yaf1"), (2, "yea")])
+    sql = """
+          CREATE PROCEDURE get_one(pk int) 
+          BEGIN 
+          SELECT * FROM t1 WHERE user_id=pk;
+          END  
+          """
+    # b = db.execute_procedure(sql)
+    # print(b)
+    r, s = db.fetchmany_procedure("get_one", (2,))
+    print(r, s)
@@ -0,0 +1,8 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : __init__.py
+# @Date    : 2026-10-18
+# @Author  : ls
+
+# pg 驱动封装：sync（psycopg2 / pg8000）、aio（asyncpg / aiopg），按需导入具体模块
@@ -0,0 +1,475 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : aiopg_pg.py
+# @Date    : 2021-04-23
+# @Author  : ls
+
+# PGDBPool 共用一个连接池，async with PGDBPool(...) as db 或 start()/close() 管理生命周期
+
+import asyncio
+import uuid
+
+import aiopg
+import psycopg2.extras
+
+from dbs.common import keyset, metrics
+from dbs.common.cache import cached_async, invalidates_async
+from dbs.common.columnar import ColumnBuilder
+from dbs.common.export import Exporter
+from dbs.common.rows import check_format, columns_of, convert, convert_one
+
+
+async def _fetch_batches(cur, sql, args, batch_size, handle):
+    """
+    服务端游标分批读取：aiopg 连接为自动提交，先 BEGIN，再 DECLARE 游标，每次 FETCH batch_size 行交给 handle(rows)
+    最后一次 handle 收到空批；普通游标 execute 时整个结果集就已读入内存
+    """
+    name = "batches_{}".format(uuid.uuid4().hex)
+    await cur.execute("BEGIN")
+    try:
+        await cur.execute("DECLARE {} NO SCROLL CURSOR FOR {}".format(name, sql.rstrip().rstrip(";")), args)
+        metrics.mark("execute")
+        while True:
+            await cur.execute("FETCH FORWARD {} FROM {}".format(int(batch_size), name))
+            data = await cur.fetchall()
+            handle(data)
+            if not data:
+                break
+    except Exception as e:
+        await cur.execute("ROLLBACK")
+        raise e
+    await cur.execute("COMMIT")
+
+
+class DB(object):
+    def __init__(self, host="localhost", port=5432, user="postgres", password="", db_name="", timeout=20, encoding="utf8",
+                 cache=None, row_format="dict"):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.db_name = db_name
+        self.timeout = timeout
+        self.encoding = encoding
+        self.cache = cache  # dbs.common.cache.ResultCache，查询传 cache_ttl 时使用
+        # query_one / query_all / query_many 的行格式，见 dbs.common.rows
+        self.row_format = check_format(row_format)
+        self._row_cursor = psycopg2.extras.DictCursor if row_format == "dict" else None
+        self.dsn = 'dbname={db_name} user={user} password={pwd} host={host} port={port}'.format(db_name=db_name, user=user, pwd=password, host=host, port=port)
+
+
+class PGDB(DB):
+
+    async def get_conn(self):
+        try:
+            conn = await aiopg.connect(host=self.host, port=self.port, user=self.user, password=self.password,
+                                       database=self.db_name, timeout=self.timeout)
+            cur = await conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        except Exception as e:
+            raise e
+        metrics.mark("acquire")
+        return conn, cur
+
+    async def get_conn_by_dsn(self):
+        try:
+            conn = await aiopg.connect(self.dsn)
+            # cur = await conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cur = await conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            # cur = await conn.cursor()
+        except Exception as e:
+            raise e
+        metrics.mark("acquire")
+        return conn, cur
+
+    @metrics.instrumented_async
+    async def query_one(self, sql, args=None):
+        """查询单条"""
+        # conn, cur = await self.get_conn()
+        conn, cur = await self.get_conn_by_dsn()
+        try:
+            sql_r = cur.mogrify(sql, args)
+            # await cur.execute(sql, args)
+            await cur.execute(sql_r)
+            metrics.mark("execute")
+            data = await cur.fetchone()
+            if self.row_format != "dict":
+                data = convert_one(cur, data, self.row_format)
+            elif data is not None:
+                data = dict(data)
+            # 不使用cursor_factory=psycopg2.extras.DictCursor
+            # fields = [col[0] for col in cur.description]
+            # data = dict(zip(fields, data))
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return data
+
+    @metrics.instrumented_async
+    async def query_all(self, sql, args=None):
+        """查询所有"""
+        # conn, cur = await self.get_conn()
+        conn, cur = await self.get_conn_by_dsn()
+        try:
+            sql_r = cur.mogrify(sql, args)
+            # await cur.execute(sql, args)
+            await cur.execute(sql_r)
+            metrics.mark("execute")
+            data = await cur.fetchall()
+            if self.row_format != "dict":
+                data = convert(cur, data, self.row_format)
+            else:
+                data = list(map(dict, data))
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return data
+
+    @metrics.instrumented_async
+    async def query_many(self, sql, args=None, page=1, per_page=10):
+        """分页查询"""
+        # conn, cur = await self.get_conn()
+        conn, cur = await self.get_conn_by_dsn()
+        try:
+            await cur.execute(sql, args)
+            metrics.mark("execute")
+            await cur.scroll((page - 1) * per_page)
+            data = await cur.fetchmany(per_page)
+            if self.row_format != "dict":
+                data = convert(cur, data, self.row_format)
+            else:
+                data = list(map(dict, data))
+            size = cur.rowcount
+            # n = cur.rownumber  # 当前页最后一个在总数中的索引
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return data, size
+
+    @metrics.instrumented_async
+    async def query_columns(self, sql, args=None, batch_size=10000):
+        """
+        列式查询，返回 {列名: NumPy 数组}，用于统计分析，需 pip install numpy
+        服务端游标（DECLARE / FETCH）每次取 batch_size 行直接按列转换，不建每行 dict，列类型见 dbs.common.columnar
+        """
+        builder = ColumnBuilder()
+        conn, cur = await self.get_conn_by_dsn()
+        try:
+            await _fetch_batches(cur, sql, args, batch_size, builder.add)
+            names = columns_of(cur.description or ())
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return builder.build(names)
+
+    @metrics.instrumented_async
+    async def export(self, sql, args, path, format="csv", batch_size=10000, schema=None):
+        """
+        导出查询结果到文件，服务端游标（DECLARE / FETCH）每次取 batch_size 行写入，内存中只保留一批（aiopg 不支持 COPY）
+        :param path: 输出文件路径
+        :param format: "csv" / "jsonl" / "parquet"（需 pip install pyarrow），见 dbs.common.export
+        :param batch_size: 每批行数
+        :param schema: parquet 列类型（pyarrow.Schema 或 [(列名, 类型)]），默认按第一批推断
+        :return: 导出行数
+        """
+        conn, cur = await self.get_conn_by_dsn()
+        try:
+            with Exporter(path, format, schema) as out:
+                await _fetch_batches(cur, sql, args, batch_size,
+                                     lambda rows: out.write(rows, columns_of(cur.description or ())))
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return out.rows
+
+    @metrics.instrumented_async
+    async def query_keyset(self, sql, args=None, order_by="id", after=None, count=10, desc=False):
+        """
+        键集分页，深页与第一页代价相同，大表翻页替代 query_many
+        :param sql: 基础查询，不含 ORDER BY / LIMIT
+        :param order_by: 排序列（结果列名），需唯一，可为元组如 ("created_at", "id")
+        :param after: 上一页返回的 next_cursor，None 为第一页
+        :return: data, next_cursor（无下一页为 None）
+        """
+        page_sql, page_args = keyset.keyset_sql(sql, args, order_by, after, count, desc)
+        conn, cur = await self.get_conn_by_dsn()
+        try:
+            await cur.execute(page_sql, page_args)
+            metrics.mark("execute")
+            data = await cur.fetchall()
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+        return keyset.next_page(map(dict, data), order_by, count)
+
+    @metrics.instrumented_async
+    async def insert(self, sql, args=None):
+        conn, cur = await self.get_conn_by_dsn()
+        try:
+            async with cur.begin():
+                await cur.execute(sql, args)
+                # last_id = cur.lastrowid  # 使用oid创建表
+        except Exception as e:
+            conn.close()
+            raise e
+        conn.close()
+
+    # async def insert_many(self, sql, args=None):
+    #     """不支持"""
+    #     conn, cur = await self.get_conn_by_dsn()
+    #     try:
+    #         async with cur.begin():
+    #             await cur.executemany(sql, args)
+    #     except Exception as e:
+    #         conn.close()
+    #         raise e
+    #     conn.close()
+
+
+class PGDBPool(DB):
+
+    def __init__(self, host="localhost", port=5432, user="postgres", password="", db_name="", timeout=20,
+                 encoding="utf8", min_size=10, max_size=100, pool_recycle=-1, cache=None, row_format="dict"):
+        super().__init__(host, port, user, password, db_name, timeout, encoding, cache, row_format)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool_recycle = pool_recycle  # 连接最大存活秒数，-1 不回收
+        self.pool = None  # 整个生命周期共用一个连接池，start() 时创建
+        self._pool_lock = None
+
+    async def get_conn_pool(self):
+        """新建一个独立的连接池，调用方负责关闭"""
+        try:
+            pool = await aiopg.create_pool(host=self.host, port=self.port, user=self.user, password=self.password,
+                                           database=self.db_name, timeout=self.timeout, minsize=self.min_size,
+                                           maxsize=self.max_size, pool_recycle=self.pool_recycle,
+                                           client_encoding=self.encoding)
+        except Exception as e:
+            raise e
+        return pool
+
+    async def get_conn_pool_by_dsn(self):
+        try:
+            pool = await aiopg.create_pool(self.dsn, timeout=self.timeout, minsize=self.min_size,
+                                           maxsize=self.max_size, pool_recycle=self.pool_recycle)
+        except Exception as e:
+            raise e
+        return pool
+
+    async def start(self):
+        """创建（首次调用时）并返回共用连接池"""
+        if self.pool is not None:
+            return self.pool
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self.pool is None:
+                self.pool = await self.get_conn_pool()
+        return self.pool
+
+    async def close(self):
+        """关闭共用连接池"""
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.close()
+            await pool.wait_closed()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @cached_async
+    @metrics.instrumented_async
+    async def query_one(self, sql, args=None):
+        """查询单条"""
+        pool = await self.start()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(cursor_factory=self._row_cursor) as cur:
+                try:
+                    await cur.execute(sql, args)
+                    metrics.mark("execute")
+                    data = await cur.fetchone()
+                    if self.row_format != "dict":
+                        data = convert_one(cur, data, self.row_format)
+                    elif data is not None:
+                        data = dict(data)
+                except Exception as e:
+                    raise e
+        return data
+
+    @cached_async
+    @metrics.instrumented_async
+    async def query_all(self, sql, args=None):
+        """查询所有"""
+        pool = await self.start()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(cursor_factory=self._row_cursor) as cur:
+                try:
+                    await cur.execute(sql, args)
+                    metrics.mark("execute")
+                    data = await cur.fetchall()
+                    if self.row_format != "dict":
+                        data = convert(cur, data, self.row_format)
+                    else:
+                        data = list(map(dict, data))
+                except Exception as e:
+                    raise e
+        return data
+
+    @metrics.instrumented_async
+    async def query_many(self, sql, args=None, page=1, per_page=10):
+        """分页查询"""
+        pool = await self.start()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(cursor_factory=self._row_cursor) as cur:
+                try:
+                    await cur.execute(sql, args)
+                    metrics.mark("execute")
+                    await cur.scroll((page - 1) * per_page)
+                    data = await cur.fetchmany(per_page)
+                    if self.row_format != "dict":
+                        data = convert(cur, data, self.row_format)
+                    else:
+                        data = list(map(dict, data))
+                    size = cur.rowcount
+                except Exception as e:
+                    raise e
+        return data, size
+
+    @metrics.instrumented_async
+    async def query_columns(self, sql, args=None, batch_size=10000):
+        """
+        列式查询，返回 {列名: NumPy 数组}，用于统计分析，需 pip install numpy
+        服务端游标（DECLARE / FETCH）每次取 batch_size 行直接按列转换，不建每行 dict，列类型见 dbs.common.columnar
+        """
+        builder = ColumnBuilder()
+        pool = await self.start()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor() as cur:
+                try:
+                    await _fetch_batches(cur, sql, args, batch_size, builder.add)
+                    names = columns_of(cur.description or ())
+                except Exception as e:
+                    raise e
+        return builder.build(names)
+
+    @metrics.instrumented_async
+    async def export(self, sql, args, path, format="csv", batch_size=10000, schema=None):
+        """
+        导出查询结果到文件，服务端游标（DECLARE / FETCH）每次取 batch_size 行写入，内存中只保留一批（aiopg 不支持 COPY）
+        :param path: 输出文件路径
+        :param format: "csv" / "jsonl" / "parquet"（需 pip install pyarrow），见 dbs.common.export
+        :param batch_size: 每批行数
+        :param schema: parquet 列类型（pyarrow.Schema 或 [(列名, 类型)]），默认按第一批推断
+        :return: 导出行数
+        """
+        pool = await self.start()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor() as cur:
+                try:
+                    with Exporter(path, format, schema) as out:
+                        await _fetch_batches(cur, sql, args, batch_size,
+                                             lambda rows: out.write(rows, columns_of(cur.description or ())))
+                except Exception as e:
+                    raise e
+        return out.rows
+
+    @metrics.instrumented_async
+    async def query_keyset(self, sql, args=None, order_by="id", after=None, count=10, desc=False):
+        """
+        键集分页，深页与第一页代价相同，大表翻页替代 query_many
+        :param sql: 基础查询，不含 ORDER BY / LIMIT
+        :param order_by: 排序列（结果列名），需唯一，可为元组如 ("created_at", "id")
+        :param after: 上一页返回的 next_cursor，None 为第一页
+        :return: data, next_cursor（无下一页为 None）
+        """
+        page_sql, page_args = keyset.keyset_sql(sql, args, order_by, after, count, desc)
+        pool = await self.start()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                try:
+                    await cur.execute(page_sql, page_args)
+                    metrics.mark("execute")
+                    data = await cur.fetchall()
+                except Exception as e:
+                    raise e
+        return keyset.next_page(map(dict, data), order_by, count)
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def insert(self, sql, args=None):
+        """插入数据，事务内执行"""
+        pool = await self.start()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                try:
+                    async with cur.begin():
+                        await cur.execute(sql, args)
+                except Exception as e:
+                    raise e
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def execute(self, sql, args=None):
+        """执行更新删除操作，事务内执行，返回影响行数"""
+        pool = await self.start()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor() as cur:
+                try:
+                    async with cur.begin():
+                        await cur.execute(sql, args)
+                except Exception as e:
+                    raise e
+                return cur.rowcount
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def execute_many(self, sql, args=None):
+        """批量执行，同一事务内逐条执行（aiopg 不支持 executemany）"""
+        pool = await self.start()
+        async with pool.acquire() as conn:
+            metrics.mark("acquire")
+            async with conn.cursor() as cur:
+                try:
+                    async with cur.begin():
+                        for item in args:
+                            await cur.execute(sql, item)
+                except Exception as e:
+                    raise e
+        return True
+
+
+if __name__ == '__main__':
+    pg = PGDB(password="123456", db_name="medicines")
+    # pg = PGDBPool(password="123456", db_name="medicines")
+
+    async def r():
+        a = await pg.query_one("SELECT * FROM illness WHERE id=%s;", (10 or '1=1',))
+        print(a)
+        # data, size = await pg.query_many("SELECT * FROM illness WHERE drug_tag=%s;", (10,), page=3, per_page=2)
+        # print(data, size)
+
+        # did = await pg.insert("INSERT INTO illness (name, spell, user_id, drug_tag) VALUES(%s, %s, %s, %s) returning id;",  ('脑子有病', 'nzyb', 0, 10))
+
+        # print(did)
+
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(r())
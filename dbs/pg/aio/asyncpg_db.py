@@ -0,0 +1,850 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : asyncpg_pg.py
+# @Date    : 2021-04-23
+# @Author  : ls
+
+# PGDBPool 共用一个连接池，async with PGDBPool(...) as db 或 start()/close() 管理生命周期
+
+import asyncio
+import collections.abc
+
+import asyncpg
+
+from dbs.common import aio, metrics
+from dbs.common.cache import cached_async, invalidates_async
+from dbs.common.columnar import ColumnBuilder
+from dbs.common.export import Exporter, discard
+from dbs.common.rows import ROW_FORMATS, check_format, make_rows
+
+
+class DB(object):
+    def __init__(self, host="localhost", port=5432, user="postgres", password="", db_name="", timeout=20,
+                 statement_cache_size=100, cache=None, row_format="dict"):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.db_name = db_name
+        self.timeout = timeout
+        self.statement_cache_size = statement_cache_size  # 每个连接自动缓存的预编译语句数，0 关闭
+        self.cache = cache  # dbs.common.cache.ResultCache，查询传 cache_ttl 时使用
+        # query_* / iterate / insert_get_value / update_return_value 的行格式，见 dbs.common.rows
+        # 另支持 "record"：asyncpg 原生 Record 不转换（可按列名 / 下标取值，解码在 C 中完成，内存约为 dict 的一半）
+        # 和 "mapping"：RecordView，Record 外的只读 Mapping 视图，不复制数据；不是 dict，json 序列化前需 dict(row)
+        self.row_format = check_format(row_format, ROW_FORMATS + ("record", "mapping"))
+
+
+class RecordView(collections.abc.Mapping):
+    """asyncpg Record 的只读映射视图，按列名或属性访问，不复制数据；json.dumps 需先 dict(row)"""
+    __slots__ = ("_record",)
+
+    def __init__(self, record):
+        self._record = record
+
+    def __getitem__(self, key):
+        return self._record[key]
+
+    def __iter__(self):
+        return iter(self._record.keys())
+
+    def __len__(self):
+        return len(self._record)
+
+    def __getattr__(self, name):
+        try:
+            return self._record[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self):
+        return "RecordView(%s)" % ", ".join("%s=%r" % item for item in self._record.items())
+
+
+def _rows(records, row_format):
+    """asyncpg Record 列表按 row_format 转换"""
+    if row_format == "record":
+        return records
+    if row_format == "dict":
+        return list(map(dict, records))
+    if row_format == "mapping":
+        return list(map(RecordView, records))
+    if not records:
+        return []
+    return make_rows(records, tuple(records[0].keys()), row_format)
+
+
+def _row(record, row_format):
+    if record is None:
+        return None
+    return _rows((record,), row_format)[0]
+
+
+def _status_count(status):
+    """execute 返回的状态如 "UPDATE 3" 取影响行数（字符串）；SET / CREATE TABLE 等无行数的返回 None"""
+    count = status.rsplit(" ", 1)[-1]
+    return count if count.isdigit() else None
+
+
+class PGDB(DB):
+
+    async def get_conn(self):
+        try:
+            conn = await asyncpg.connect(host=self.host, port=self.port, user=self.user, password=self.password,
+                                         database=self.db_name, timeout=self.timeout,
+                                         statement_cache_size=self.statement_cache_size)
+        except Exception as e:
+            raise e
+        metrics.mark("acquire")
+        return conn
+
+    async def get_conn_by_dsn(self):
+        try:
+            conn = await asyncpg.connect(
+                "postgres://{user}:{password}@{host}:{port}/{database}".format(
+                    user=self.user, password=self.password, host=self.host, port=self.port, database=self.db_name),
+                statement_cache_size=self.statement_cache_size
+            )
+        except Exception as e:
+            raise e
+        metrics.mark("acquire")
+        return conn
+
+    @metrics.instrumented_async
+    async def query_one(self, sql, *args):
+        """返回符合条件的第一条"""
+        # conn = await self.get_conn()
+        conn = await self.get_conn_by_dsn()
+        try:
+            row = await conn.fetchrow(sql, *args)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return _row(row, self.row_format)
+
+    @metrics.instrumented_async
+    async def query_first_data(self, sql, *args, col=0):
+        """返回符合条件的第一条数据索引为默认0的数据"""
+        # conn = await self.get_conn()
+        conn = await self.get_conn_by_dsn()
+        try:
+            row = await conn.fetchval(sql, *args, column=col)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return row
+
+    @metrics.instrumented_async
+    async def query_all(self, sql, *args):
+        """返回符合条件的所有数据"""
+        conn = await self.get_conn()
+        try:
+            row = await conn.fetch(sql, *args)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return _rows(row, self.row_format)
+
+    @metrics.instrumented_async
+    async def query_columns(self, sql, *args, batch_size=10000):
+        """
+        列式查询，返回 {列名: NumPy 数组}，用于统计分析，需 pip install numpy
+        服务端游标每次取 batch_size 行直接按列转换，不建每行 dict，列类型见 dbs.common.columnar
+        """
+        builder = ColumnBuilder()
+        conn = await self.get_conn_by_dsn()
+        try:
+            async with conn.transaction():
+                stmt = await conn.prepare(sql)
+                cur = await stmt.cursor(*args)
+                metrics.mark("execute")
+                while True:
+                    data = await cur.fetch(batch_size)
+                    if not data:
+                        break
+                    builder.add(data)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return builder.build([attr.name for attr in stmt.get_attributes()])
+
+    @metrics.instrumented_async
+    async def export(self, sql, *args, path, format="csv", batch_size=10000, schema=None):
+        """
+        导出查询结果到文件，内存中只保留一批行，用于大表导出
+        csv 由 copy_from_query（COPY (...) TO STDOUT）在服务端生成直接写入文件，其余格式用游标每次取 batch_size 行
+        :param path: 输出文件路径
+        :param format: "csv" / "jsonl" / "parquet"（需 pip install pyarrow），见 dbs.common.export
+        :param batch_size: 每批行数
+        :param schema: parquet 列类型（pyarrow.Schema 或 [(列名, 类型)]），默认按第一批推断
+        :return: 导出行数
+        """
+        conn = await self.get_conn_by_dsn()
+        try:
+            async with conn.transaction():
+                if format == "csv":
+                    try:
+                        status = await conn.copy_from_query(sql, *args, output=path, format="csv", header=True)
+                    except Exception as e:
+                        discard(path)  # 删除写了一半的文件
+                        raise e
+                    metrics.mark("execute")
+                    return int(status.split()[-1])
+                with Exporter(path, format, schema) as out:
+                    stmt = await conn.prepare(sql)
+                    cur = await stmt.cursor(*args)
+                    metrics.mark("execute")
+                    names = [attr.name for attr in stmt.get_attributes()]
+                    while True:
+                        data = await cur.fetch(batch_size)
+                        out.write(data, names)
+                        if not data:
+                            break
+        except Exception as e:
+            raise e
+        finally:
+            await conn.close()
+        return out.rows
+
+    async def iterate(self, sql, *args, prefetch=500):
+        """
+        服务端游标流式读取，内存中最多保留 prefetch 行：async for row in db.iterate(sql, *args)
+        读取期间占用一个连接；中途 break 时用 contextlib.aclosing(db.iterate(...)) 包裹可立即释放连接
+        """
+        conn = await self.get_conn()
+        try:
+            async with conn.transaction():
+                async for row in conn.cursor(sql, *args, prefetch=prefetch):
+                    yield _row(row, self.row_format)
+        finally:
+            await conn.close()
+
+    @metrics.instrumented_async
+    async def insert(self, sql, *args):
+        """
+        插入数据
+        """
+        conn = await self.get_conn()
+        try:
+            async with conn.transaction():
+                data = await conn.execute(sql, *args)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        data = data.split(" ")[2]
+        return data
+
+    @metrics.instrumented_async
+    async def insert_get_value(self, sql, *args):
+        """
+        插入数据获取value, SQL语句加 RETURNING value; 返回主键 RETURNING id
+        """
+        conn = await self.get_conn()
+        try:
+            row = await conn.fetch(sql, *args)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return _rows(row[:1], self.row_format)[0]
+
+    @metrics.instrumented_async
+    async def insert_many(self, sql, args):
+        """
+        批量查入数据
+        :param sql:
+        :param args: list
+        :return: Bool
+        """
+        conn = await self.get_conn()
+        try:
+            async with conn.transaction():
+                await conn.executemany(sql, args)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return True
+
+    @metrics.instrumented_async
+    async def copy_insert(self, table, columns, records, schema_name=None):
+        """
+        COPY 二进制协议批量插入，比 insert_many 的逐行 executemany 快一个数量级以上
+        :param table: 表名
+        :param columns: 列名 list，与每行 tuple 顺序一致
+        :param records: tuple 的可迭代对象或异步可迭代对象，可边生成边写入
+        :param schema_name: 模式名，默认 search_path
+        :return: 插入行数
+        """
+        conn = await self.get_conn()
+        try:
+            status = await conn.copy_records_to_table(table, records=records, columns=columns,
+                                                      schema_name=schema_name)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return int(status.split(" ")[1])
+
+    @metrics.instrumented_async
+    async def update(self, sql, *args):
+        """更新"""
+        conn = await self.get_conn()
+        try:
+            async with conn.transaction():
+                # 修改一条记录, 返回一个字符串
+                row = await conn.execute(sql, *args)
+                row = _status_count(row)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return row
+
+    @metrics.instrumented_async
+    async def update_many(self, sql, args):
+        """
+        批量更新
+        :param sql:
+        :param args: tuple list
+        :return: Bool
+        await conn.executemany("update t1 set name = $1 where id = $2",
+                               [("name1", 1), ("name2", 2)])
+        """
+        conn = await self.get_conn()
+        try:
+            async with conn.transaction():
+                await conn.executemany(sql, args)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return True
+
+    @metrics.instrumented_async
+    async def update_return_value(self, sql, *args):
+        """更新返回value, SQL 加 RETURNING value（主键）"""
+        conn = await self.get_conn()
+        try:
+            async with conn.transaction():
+                row = await conn.fetch(sql, *args)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return _rows(row[:1], self.row_format)[0]
+
+    @metrics.instrumented_async
+    async def delete(self, sql, *args):
+        """删除"""
+        conn = await self.get_conn()
+        try:
+            async with conn.transaction():
+                row = await conn.execute(sql, *args)
+                row = _status_count(row)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return row
+
+    @metrics.instrumented_async
+    async def delete_many(self, sql, args):
+        """
+        批量删除
+        :param sql:
+        :param args: tuple list [(p1,),(p2)]
+        :return:
+        """
+        conn = await self.get_conn()
+        try:
+            async with conn.transaction():
+                await conn.executemany(sql, args)
+        except Exception as e:
+            await conn.close()
+            raise e
+        await conn.close()
+        return True
+
+
+class PGDBPool(DB):
+
+    def __init__(self, host="localhost", port=5432, user="postgres", password="", db_name="",
+                 min_size=10, max_size=100, max_queries=50000, max_inactive_connection_lifetime=300, init=None,
+                 timeout=20, statement_cache_size=100, cache=None, row_format="dict"):
+        super(PGDBPool, self).__init__(host, port, user, password, db_name, timeout, statement_cache_size, cache,
+                                       row_format)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_queries = max_queries  # 最大查询数量, 超过了就换新的连接，默认50000
+        # 最大不活跃时间，默认300，超过则自动关闭
+        self.max_inactive_connection_lifetime = max_inactive_connection_lifetime
+        # 每个新连接建立后调用一次 async def init(conn)，如 set_type_codec、SET search_path
+        self.init = init
+        self.pool = None  # 整个生命周期共用一个连接池，start() 时创建
+        self._pool_lock = None
+        self.statements = {}  # prepare() 登记的语句 name -> sql
+        self._prepared = {}  # 底层连接 -> {name: PreparedStatement}
+        self.prepared_hits = 0
+        self.prepared_misses = 0
+
+    async def get_conn_pool(self):
+        """新建一个独立的连接池，调用方负责关闭"""
+        try:
+            pool = await asyncpg.create_pool(host=self.host, port=self.port, user=self.user, password=self.password,
+                                             database=self.db_name, command_timeout=self.timeout, min_size=self.min_size,
+                                             max_size=self.max_size, max_queries=self.max_queries,
+                                             max_inactive_connection_lifetime=self.max_inactive_connection_lifetime,
+                                             init=self.init, statement_cache_size=self.statement_cache_size)
+        except Exception as e:
+            raise e
+        return pool
+
+    async def get_conn_pool_by_dsn(self):
+        try:
+            pool = await asyncpg.create_pool(
+                "postgres://{user}:{password}@{host}:{port}/{database}".format(
+                    user=self.user, password=self.password, host=self.host, port=self.port, database=self.db_name),
+                min_size=self.min_size, max_size=self.max_size, max_queries=self.max_queries,
+                max_inactive_connection_lifetime=self.max_inactive_connection_lifetime, init=self.init,
+                statement_cache_size=self.statement_cache_size)
+        except Exception as e:
+            raise e
+        return pool
+
+    async def start(self):
+        """创建（首次调用时）并返回共用连接池"""
+        if self.pool is not None:
+            return self.pool
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self.pool is None:
+                self.pool = await self.get_conn_pool()
+        return self.pool
+
+    async def close(self):
+        """关闭共用连接池"""
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            await pool.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def prepare(self, name, sql):
+        """
+        登记预编译语句，每个连接首次使用时 prepare 一次，之后按名称调用，跳过解析和生成计划
+        await db.query_one_prepared("user_by_id", 1)
+        """
+        self.statements[name] = sql
+
+    def prepared_stats(self):
+        """预编译语句命中统计"""
+        return {"hits": self.prepared_hits, "misses": self.prepared_misses,
+                "statements": len(self.statements), "connections": len(self._prepared)}
+
+    async def _get_prepared(self, conn, name):
+        sql = self.statements[name]
+        raw = getattr(conn, "_con", conn)  # acquire() 返回连接代理，按底层连接缓存
+        cached = self._prepared.get(raw)
+        if cached is None:
+            # 新连接，顺便清掉已关闭连接的缓存
+            for old in [c for c in self._prepared if c.is_closed()]:
+                del self._prepared[old]
+            cached = self._prepared[raw] = {}
+        stmt = cached.get(name)
+        if stmt is None:
+            self.prepared_misses += 1
+            stmt = cached[name] = await conn.prepare(sql)
+        else:
+            self.prepared_hits += 1
+        return stmt
+
+    @metrics.instrumented_async
+    async def query_one_prepared(self, name, *args):
+        """按名称执行预编译语句，返回第一条"""
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                stmt = await self._get_prepared(conn, name)
+                row = await stmt.fetchrow(*args)
+        except Exception as e:
+            raise e
+        return _row(row, self.row_format)
+
+    @metrics.instrumented_async
+    async def query_all_prepared(self, name, *args):
+        """按名称执行预编译语句，返回所有数据"""
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                stmt = await self._get_prepared(conn, name)
+                row = await stmt.fetch(*args)
+        except Exception as e:
+            raise e
+        return _rows(row, self.row_format)
+
+    @metrics.instrumented_async
+    async def execute_prepared(self, name, *args):
+        """按名称执行预编译的增删改语句，返回状态如 UPDATE 1"""
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                stmt = await self._get_prepared(conn, name)
+                async with conn.transaction():
+                    await stmt.fetch(*args)
+                status = stmt.get_statusmsg()
+        except Exception as e:
+            raise e
+        return status
+
+    @cached_async
+    @metrics.instrumented_async
+    async def query_one(self, sql, *args):
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                row = await conn.fetchrow(sql, *args)
+        except Exception as e:
+            raise e
+        return _row(row, self.row_format)
+
+    @cached_async
+    @metrics.instrumented_async
+    async def query_first_data(self, sql, *args, col=0):
+        """返回符合条件的第一条数据索引为默认0的数据"""
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                row = await conn.fetchval(sql, *args, column=col)
+        except Exception as e:
+            raise e
+        return row
+
+    @cached_async
+    @metrics.instrumented_async
+    async def query_all(self, sql, *args):
+        """返回符合条件的所有数据"""
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                row = await conn.fetch(sql, *args)
+        except Exception as e:
+            raise e
+        return _rows(row, self.row_format)
+
+    async def batch(self, queries, fetch="one"):
+        """
+        并发执行多条互不依赖的查询，按顺序返回结果，耗时约为最慢的一条而非逐条相加
+        asyncpg 单个连接不能并发，每条查询各取一个池中连接，超过连接池大小时排队；任一出错则取消其余
+        :param queries: [(sql, arg1, arg2, ...), ...]
+        :param fetch: "one" / "all" / "val"，对应 query_one / query_all / query_first_data；
+                      也可传与 queries 等长的 list 逐条指定
+        :return: list
+        """
+        methods = {"one": self.query_one, "all": self.query_all, "val": self.query_first_data}
+        kinds = [fetch] * len(queries) if isinstance(fetch, str) else list(fetch)
+        if len(kinds) != len(queries):
+            raise ValueError("fetch list length does not match queries")
+        await self.start()
+        return await aio.gather(*(methods[kind](sql, *args) for kind, (sql, *args) in zip(kinds, queries)))
+
+    async def map_concurrent(self, sql, args_iter, concurrency=None, ordered=False, fetch="all"):
+        """
+        同一条 SQL 按多组参数并发执行，边执行边 async yield (args, 结果)
+        async for args, rows in db.map_concurrent("SELECT * FROM t1 WHERE user_id=$1", ((i,) for i in ids)):
+        :param args_iter: 参数 tuple 的可迭代对象或异步可迭代对象，按需读取
+        :param concurrency: 并发数，默认且最大为连接池大小 max_size
+        :param ordered: True 按输入顺序返回，否则按完成顺序
+        :param fetch: "one" / "all" / "val"，对应 query_one / query_all / query_first_data
+        任一出错时取消其余未完成的查询并抛出异常
+        提前 break 时用 async with contextlib.aclosing(db.map_concurrent(...)) as results 包裹，退出即取消其余查询
+        """
+        method = {"one": self.query_one, "all": self.query_all, "val": self.query_first_data}[fetch]
+        concurrency = min(concurrency or self.max_size, self.max_size)
+        await self.start()
+        results = aio.map_concurrent(lambda args: method(sql, *args), args_iter, concurrency, ordered)
+        try:
+            async for item in results:
+                yield item
+        finally:
+            # 本生成器关闭时立即关闭内层，取消未完成的查询、归还连接，不等垃圾回收
+            await results.aclose()
+
+    @metrics.instrumented_async
+    async def query_columns(self, sql, *args, batch_size=10000):
+        """
+        列式查询，返回 {列名: NumPy 数组}，用于统计分析，需 pip install numpy
+        服务端游标每次取 batch_size 行直接按列转换，不建每行 dict，列类型见 dbs.common.columnar
+        """
+        builder = ColumnBuilder()
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                async with conn.transaction():
+                    stmt = await conn.prepare(sql)
+                    cur = await stmt.cursor(*args)
+                    metrics.mark("execute")
+                    while True:
+                        data = await cur.fetch(batch_size)
+                        if not data:
+                            break
+                        builder.add(data)
+        except Exception as e:
+            raise e
+        return builder.build([attr.name for attr in stmt.get_attributes()])
+
+    @metrics.instrumented_async
+    async def export(self, sql, *args, path, format="csv", batch_size=10000, schema=None):
+        """
+        导出查询结果到文件，内存中只保留一批行，用于大表导出
+        csv 由 copy_from_query（COPY (...) TO STDOUT）在服务端生成直接写入文件，其余格式用游标每次取 batch_size 行
+        :param path: 输出文件路径
+        :param format: "csv" / "jsonl" / "parquet"（需 pip install pyarrow），见 dbs.common.export
+        :param batch_size: 每批行数
+        :param schema: parquet 列类型（pyarrow.Schema 或 [(列名, 类型)]），默认按第一批推断
+        :return: 导出行数
+        """
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                async with conn.transaction():
+                    if format == "csv":
+                        try:
+                            status = await conn.copy_from_query(sql, *args, output=path, format="csv", header=True)
+                        except Exception as e:
+                            discard(path)  # 删除写了一半的文件
+                            raise e
+                        metrics.mark("execute")
+                        return int(status.split()[-1])
+                    with Exporter(path, format, schema) as out:
+                        stmt = await conn.prepare(sql)
+                        cur = await stmt.cursor(*args)
+                        metrics.mark("execute")
+                        names = [attr.name for attr in stmt.get_attributes()]
+                        while True:
+                            data = await cur.fetch(batch_size)
+                            out.write(data, names)
+                            if not data:
+                                break
+        except Exception as e:
+            raise e
+        return out.rows
+
+    async def iterate(self, sql, *args, prefetch=500):
+        """
+        服务端游标流式读取，内存中最多保留 prefetch 行：async for row in db.iterate(sql, *args)
+        读取期间占用一个连接；中途 break 时用 contextlib.aclosing(db.iterate(...)) 包裹可立即释放连接
+        """
+        pool = await self.start()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                async for row in conn.cursor(sql, *args, prefetch=prefetch):
+                    yield _row(row, self.row_format)
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def insert(self, sql, *args):
+        """
+        插入数据
+        """
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                async with conn.transaction():
+                    data = await conn.execute(sql, *args)
+        except Exception as e:
+            raise e
+        data = data.split(" ")[2]
+        return data
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def insert_get_value(self, sql, *args):
+        """
+        插入数据获取value, SQL语句加 RETURNING value; 返回主键 RETURNING id
+        """
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                row = await conn.fetch(sql, *args)
+        except Exception as e:
+            raise e
+        return _rows(row[:1], self.row_format)[0]
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def insert_many(self, sql, args):
+        """
+        批量查入数据
+        :param sql:
+        :param args: list
+        :return: Bool
+        """
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                async with conn.transaction():
+                    await conn.executemany(sql, args)
+        except Exception as e:
+            raise e
+        return True
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def copy_insert(self, table, columns, records, schema_name=None):
+        """
+        COPY 二进制协议批量插入，比 insert_many 的逐行 executemany 快一个数量级以上
+        :param table: 表名
+        :param columns: 列名 list，与每行 tuple 顺序一致
+        :param records: tuple 的可迭代对象或异步可迭代对象，可边生成边写入
+        :param schema_name: 模式名，默认 search_path
+        :return: 插入行数
+        """
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                status = await conn.copy_records_to_table(table, records=records, columns=columns,
+                                                          schema_name=schema_name)
+        except Exception as e:
+            raise e
+        return int(status.split(" ")[1])
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def update(self, sql, *args):
+        """更新"""
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                async with conn.transaction():
+                    # 修改一条记录, 返回一个字符串
+                    row = await conn.execute(sql, *args)
+                    row = _status_count(row)
+        except Exception as e:
+            raise e
+        return row
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def update_many(self, sql, args):
+        """
+        批量更新
+        :param sql:
+        :param args: tuple list
+        :return: Bool
+        await conn.executemany("update t1 set name = $1 where id = $2",
+                               [("name1", 1), ("name2", 2)])
+        """
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                async with conn.transaction():
+                    await conn.executemany(sql, args)
+        except Exception as e:
+            raise e
+        return True
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def update_return_value(self, sql, *args):
+        """更新返回value, SQL 加 RETURNING value（主键）"""
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                async with conn.transaction():
+                    row = await conn.fetch(sql, *args)
+        except Exception as e:
+            raise e
+        return _rows(row[:1], self.row_format)[0]
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def delete(self, sql, *args):
+        """删除"""
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                async with conn.transaction():
+                    row = await conn.execute(sql, *args)
+                    row = _status_count(row)
+        except Exception as e:
+            raise e
+        return row
+
+    @invalidates_async
+    @metrics.instrumented_async
+    async def delete_many(self, sql, args):
+        """
+        批量删除
+        :param sql:
+        :param args: tuple list [(p1,),(p2)]
+        :return:
+        """
+        pool = await self.start()
+        try:
+            async with pool.acquire() as conn:
+                metrics.mark("acquire")
+                async with conn.transaction():
+                    await conn.executemany(sql, args)
+        except Exception as e:
+            raise e
+        return True
+
+
+if __name__ == '__main__':
+    # pg = PGDB(password="123456", db_name="medicines")
+    pg = PGDBPool(password="123456", db_name="medicines")
+
+    async def r():
+        data = await pg.query_one("SELECT * FROM illness WHERE drug_tag=$1", 10)
+        # pg.prepare("illness_by_id", "SELECT * FROM illness WHERE id=$1")
+        # data = await pg.query_one_prepared("illness_by_id", 10)
+        # print(pg.prepared_stats())
+        # data = await pg.query_first_data("SELECT * FROM illness WHERE drug_tag=$1", 10)
+        # data = await pg.query_all("SELECT * FROM illness WHERE drug_tag=$1", 10)
+        # one, rows = await pg.batch([("SELECT * FROM illness WHERE id=$1", 10), ("SELECT * FROM illness WHERE drug_tag=$1", 10)], fetch=["one", "all"])
+        # async for row in pg.iterate("SELECT * FROM illness WHERE drug_tag=$1", 10, prefetch=1000):
+        #     print(row)
+        # data = await pg.insert("INSERT INTO illness (name, spell, user_id, drug_tag) VALUES ($1, $2, $3, $4);",  '脑子有病', 'nzyb', 0, 10)
+        # data = await pg.insert_get_value("INSERT INTO illness (name, spell, user_id, drug_tag) VALUES($1, $2, $3, $4) RETURNING id;",  '脑子有病', 'nzyb', 0, 10)
+        # data = await pg.insert_many("INSERT INTO illness (name, spell, user_id, drug_tag) VALUES($1, $2, $3, $4);",  [('aa', 'nzyba', 0, 10),('bb', 'nzyba', 0, 10)])
+        # data = await pg.copy_insert("illness", ["name", "spell", "user_id", "drug_tag"], [('aa', 'nzyba', 0, 10), ('bb', 'nzyba', 0, 10)])
+        # data = await pg.update("update illness set name=$1 where id=$2;", "haha", 513)
+        # data = await pg.update_return_value("update illness set name=$1 where id=$2 returning name;", "haha", 513)
+        # data = await pg.update_many("update illness set name=$1 where id=$2;", [("haha1", 513),("hehe", 514)])
+        # data = await pg.delete("delete from illness where id=$1;", 514,)
+        # data = await pg.delete_many("delete from illness where id=$1;", [(503,), (513,)])
+        print(data)
+        await pg.close()
+
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(r())
@@ -0,0 +1,225 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : pg8000_db.py
+# @Date    : 2021-04-29
+# @Author  : ls
+
+# 不支持cursor.scroll()
+# 不支持字典属性返回
+
+import contextlib
+import uuid
+
+import pg8000
+import pg8000.native
+import pg8000.dbapi
+
+from dbs.common import metrics
+from dbs.common.cache import cached, invalidates
+from dbs.common.columnar import ColumnBuilder
+from dbs.common.export import Exporter, open_copy
+from dbs.common.rows import check_format, columns_of, convert, convert_one
+
+
+def _fetch_batches(cursor, sql, args, batch_size, handle):
+    """
+    服务端游标分批读取（需在事务内）：DECLARE 游标，每次 FETCH batch_size 行交给 handle(rows)
+    最后一次 handle 收到空批；pg8000 普通游标 execute 时整个结果集就已读入内存
+    """
+    name = "batches_{}".format(uuid.uuid4().hex)
+    cursor.execute("DECLARE {} NO SCROLL CURSOR FOR {}".format(name, sql.rstrip().rstrip(";")), args)
+    metrics.mark("execute")
+    while True:
+        cursor.execute("FETCH FORWARD {} FROM {}".format(int(batch_size), name))
+        data = cursor.fetchall()
+        handle(data)
+        if not data:
+            break
+    cursor.execute("CLOSE {}".format(name))
+
+
+class DB(object):
+    def __init__(self, user="postgres", host="localhost", port=5432, password="", db_name="", timeout=20,
+                 cache=None, row_format="dict"):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.port = port
+        self.db_name = db_name
+        self.timeout = timeout
+        self.cache = cache  # dbs.common.cache.ResultCache，查询传 cache_ttl 时使用
+        self.row_format = check_format(row_format)  # query_one / query_all / query_many 的行格式，见 dbs.common.rows
+        self.conn = self.get_connection()
+        self.native_conn = self.get_native_connection()
+
+    def get_connection(self):
+        try:
+            conn = pg8000.connect(self.user, host=self.host, port=self.port, password=self.password, database=self.db_name, timeout=self.timeout)
+            # conn = pg8000.dbapi.connect(self.user, host=self.host, port=self.port, password=self.password, database=self.db_name, timeout=self.timeout)
+        except Exception as e:
+            raise e
+        return conn
+
+    def get_native_connection(self):
+        try:
+            conn = pg8000.native.Connection(self.user, host=self.host, port=self.port, password=self.password, database=self.db_name, timeout=self.timeout)
+        except Exception as e:
+            raise e
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        实例共用一个连接，已关闭时重新连接；成功提交，异常回滚
+        不用 with self.conn：pg8000 退出 with 时会关闭连接，实例第二次调用即失败
+        """
+        if self.conn is None:
+            self.conn = self.get_connection()
+        conn = self.conn
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def close(self):
+        """关闭连接，可重复调用；之后再调用方法会重新连接"""
+        conn, self.conn = self.conn, None
+        native_conn, self.native_conn = self.native_conn, None
+        for c in (conn, native_conn):
+            if c is not None:
+                c.close()
+
+    @cached
+    @metrics.instrumented
+    def query_one(self, sql, args=None):
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    data = convert_one(cursor, cursor.fetchone(), self.row_format)
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def query_many(self, sql, args=None, page=1, count=10):
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    # 不支持 cursor.scroll；结果已全部取回客户端，跳过前面的页，size 同其他驱动为总行数
+                    cursor.fetchmany((page - 1) * count)
+                    data = convert(cursor, cursor.fetchmany(count), self.row_format)
+                    size = cursor.rowcount
+        except Exception as e:
+            raise e
+        return data, size
+
+    @cached
+    @metrics.instrumented
+    def query_all(self, sql, args=None):
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql, args)
+                    metrics.mark("execute")
+                    data = convert(cursor, cursor.fetchall(), self.row_format)
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def query_columns(self, sql, args=None, batch_size=10000):
+        """
+        列式查询，返回 {列名: NumPy 数组}，用于统计分析，需 pip install numpy
+        服务端游标（DECLARE / FETCH）每次取 batch_size 行直接按列转换，不建每行 dict，列类型见 dbs.common.columnar
+        """
+        builder = ColumnBuilder()
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    _fetch_batches(cursor, sql, args, batch_size, builder.add)
+                    names = columns_of(cursor.description or ())
+        except Exception as e:
+            raise e
+        return builder.build(names)
+
+    @metrics.instrumented
+    def export(self, sql, args, path, format="csv", batch_size=10000, schema=None):
+        """
+        导出查询结果到文件，内存中只保留一批行，用于大表导出
+        csv 且无参数时由 COPY (...) TO STDOUT 在服务端生成直接写入文件（COPY 不支持参数），
+        其余用服务端游标（DECLARE / FETCH）每次取 batch_size 行
+        :param path: 输出文件路径
+        :param format: "csv" / "jsonl" / "parquet"（需 pip install pyarrow），见 dbs.common.export
+        :param batch_size: 每批行数
+        :param schema: parquet 列类型（pyarrow.Schema 或 [(列名, 类型)]），默认按第一批推断
+        :return: 导出行数
+        """
+        try:
+            with self.connection() as conn:
+                if format == "csv" and not args:
+                    with conn.cursor() as cursor, open_copy(path) as f:
+                        query = sql.rstrip().rstrip(";")
+                        cursor.execute("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER)".format(query), stream=f)
+                        metrics.mark("execute")
+                        return cursor.rowcount
+                with Exporter(path, format, schema) as out:
+                    with conn.cursor() as cursor:
+                        _fetch_batches(cursor, sql, args, batch_size,
+                                       lambda rows: out.write(rows, columns_of(cursor.description or ())))
+        except Exception as e:
+            raise e
+        return out.rows
+
+    @invalidates
+    @metrics.instrumented
+    def execute(self, sql, args=None):
+        """执行更新删除操作，返回影响行数"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql, args)
+                    data = cursor.rowcount
+        except Exception as e:
+            raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def execute_many(self, sql, args=None):
+        """批量执行更新删除操作"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.executemany(sql, args)
+                    data = cursor.rowcount
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def query_one_native(self, sql, **args):
+        if self.native_conn is None:
+            self.native_conn = self.get_native_connection()
+        try:
+            value = self.native_conn.run(sql, **args)
+        except Exception as e:
+            raise e
+        keys = [k["name"] for k in self.native_conn.columns]
+        data = dict(zip(keys, value[0]))
+        return data
+
+
+if __name__ == '__main__':
+    db = DB(password="123456", db_name="medicines")
+    # res = db.query_one("SELECT * FROM illness WHERE id=%s;", (1,))
+    # res = db.query_one_native("SELECT * FROM illness WHERE id = :pk;", pk=1)
+    # res, s = db.query_many("SELECT * FROM illness WHERE drug_tag=%s LIMIT %s OFFSET %s;", (10, 10, 10))
+    res, s = db.query_many("SELECT * FROM illness WHERE drug_tag=%s OFFSET %s;", (10, 0))
+    print(res, s)
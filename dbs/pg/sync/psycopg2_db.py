@@ -0,0 +1,626 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# @File    : psycopg2_db.py
+# @Date    : 2021-04-27
+# @Author  : ls
+
+# PGDB 单连接，多线程共用时会串行；多线程（如 WSGI worker）使用 PGDBPool，每次调用从连接池取出、用完归还
+
+import contextlib
+import datetime
+import decimal
+import io
+import itertools
+import json
+import threading
+import time
+import uuid
+
+import psycopg2
+
+import psycopg2.extras
+import psycopg2.pool
+from psycopg2 import sql as pgsql
+
+from dbs.common import keyset, metrics
+from dbs.common.cache import cached, invalidates
+from dbs.common.columnar import ColumnBuilder
+from dbs.common.export import Exporter, open_copy
+from dbs.common.rows import check_format, columns_of, convert, convert_one
+
+
+class ConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool 基础上增加：池满等待、取出时健康检查、最大存活时间轮换、空闲连接保留到 maxconn 个
+    :param timeout: 池满时取连接的最长等待秒数
+    :param ping: 取出时执行 SELECT 1 检查连接
+    :param max_lifetime: 连接最大存活秒数，超过则关闭重建，None 不限
+    """
+
+    def __init__(self, minconn, maxconn, *args, timeout=10, ping=True, max_lifetime=3600, **kwargs):
+        self.timeout = timeout
+        self.ping = ping
+        self.max_lifetime = max_lifetime
+        self._born = {}  # id(conn) -> 创建时间
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super(ConnectionPool, self).__init__(minconn, maxconn, *args, **kwargs)
+
+    def _connect(self, key=None):
+        conn = super(ConnectionPool, self)._connect(key)
+        self._born[id(conn)] = time.monotonic()
+        return conn
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError("get connection from pool timeout ({}s)".format(self.timeout))
+        try:
+            for _ in range(self.maxconn + 1):
+                conn = super(ConnectionPool, self).getconn(key)
+                if self._usable(conn):
+                    return conn
+                self._discard(conn, key)
+            raise psycopg2.pool.PoolError("no usable connection in pool")
+        except Exception as e:
+            self._slots.release()
+            raise e
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            if close or self._expired(conn):
+                self._discard(conn, key)
+            else:
+                super(ConnectionPool, self).putconn(conn, key)
+                if conn.closed:
+                    self._born.pop(id(conn), None)
+        finally:
+            self._slots.release()
+
+    def _putconn(self, conn, key=None, close=False):
+        # 父类空闲连接达到 minconn 后归还的连接一律关闭，并发时连接反复重建；改为最多保留 maxconn 个空闲连接
+        # putconn 持锁调用，临时替换 minconn 不影响其他线程
+        minconn, self.minconn = self.minconn, self.maxconn
+        try:
+            super(ConnectionPool, self)._putconn(conn, key, close)
+        finally:
+            self.minconn = minconn
+
+    def _discard(self, conn, key=None):
+        self._born.pop(id(conn), None)
+        super(ConnectionPool, self).putconn(conn, key, close=True)
+
+    def _expired(self, conn):
+        born = self._born.get(id(conn))
+        return self.max_lifetime is not None and born is not None and time.monotonic() - born > self.max_lifetime
+
+    def _usable(self, conn):
+        if conn.closed or self._expired(conn):
+            return False
+        if self.ping:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            except Exception:
+                return False
+        return True
+
+
+_COPY_ESCAPE = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+_COPY_SCALARS = (str, int, float, decimal.Decimal, datetime.date, datetime.time, uuid.UUID)
+
+
+def _copy_text(value):
+    """单个非 NULL 值转为 pg 输入文本（未做 COPY 转义）"""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()  # bytea 十六进制
+    if isinstance(value, dict):
+        return json.dumps(value)  # json / jsonb
+    if isinstance(value, (list, tuple)):
+        return _array_literal(value)
+    if isinstance(value, datetime.timedelta):
+        return "%d days %d seconds %d microseconds" % (value.days, value.seconds, value.microseconds)
+    if isinstance(value, _COPY_SCALARS):
+        return str(value)
+    raise TypeError("copy_from_rows: unsupported value type %s" % type(value).__name__)
+
+
+def _array_literal(values):
+    """list / tuple 转为 pg 数组字面量 {...}，元素加双引号转义，嵌套 list 为多维数组"""
+    items = []
+    for value in values:
+        if value is None:
+            items.append("NULL")
+        elif isinstance(value, (list, tuple)):
+            items.append(_array_literal(value))
+        else:
+            items.append('"%s"' % _copy_text(value).replace("\\", "\\\\").replace('"', '\\"'))
+    return "{%s}" % ",".join(items)
+
+
+def _copy_value(value):
+    """单个值转为 COPY 文本格式"""
+    if value is None:
+        return "\\N"
+    return _copy_text(value).translate(_COPY_ESCAPE)
+
+
+class _CopyRows(io.TextIOBase):
+    """按页把行序列化为 COPY 文本格式，供 copy_expert 读取，内存中只保留一页"""
+
+    def __init__(self, rows, page_size=10000):
+        self._rows = iter(rows)
+        self._page_size = page_size
+        self._buf = ""
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if self._pos >= len(self._buf):
+            page = itertools.islice(self._rows, self._page_size)
+            self._buf = "".join("\t".join(map(_copy_value, row)) + "\n" for row in page)
+            self._pos = 0
+        if size is None or size < 0:
+            size = len(self._buf)
+        data = self._buf[self._pos:self._pos + size]
+        self._pos += len(data)
+        return data
+
+
+class DB(object):
+    def __init__(self, host="localhost", port=5432, user="postgres", password="", db_name="", timeout=20, cache=None,
+                 row_format="dict"):
+        self.timeout = timeout
+        self.cache = cache  # dbs.common.cache.ResultCache，查询传 cache_ttl 时使用
+        # query_one / query_all / query_many 的行格式，见 dbs.common.rows
+        self.row_format = check_format(row_format)
+        self._row_cursor = psycopg2.extras.DictCursor if row_format == "dict" else None
+        self.dsn = 'dbname={db_name} user={user} password={pwd} host={host} port={port}'.format(db_name=db_name,
+                                                                                                user=user, pwd=password,
+                                                                                                host=host, port=port)
+
+
+class PGDB(DB):
+    def __init__(self, host="localhost", port=5432, user="postgres", password="", db_name="", timeout=20, cache=None,
+                 row_format="dict"):
+        super(PGDB, self).__init__(host, port, user, password, db_name, timeout, cache, row_format)
+        self.conn = self.get_connection()
+
+    def get_connection(self):
+        try:
+            conn = psycopg2.connect(self.dsn)
+        except Exception as e:
+            raise e
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """with 块内的操作为一个事务，正常结束提交，异常回滚"""
+        with self.conn:
+            yield self.conn
+
+    @cached
+    @metrics.instrumented
+    def query_one(self, sql, args=None):
+        """查询单条"""
+        # cur = self.conn.cursor()
+        try:
+            with self.connection() as conn:
+                with conn.cursor(cursor_factory=self._row_cursor) as cur:
+                    cur.execute(sql, args)
+                    metrics.mark("execute")
+                    data = cur.fetchone()
+                    if self.row_format != "dict":
+                        data = convert_one(cur, data, self.row_format)
+                    elif data is not None:
+                        data = dict(data)
+        except Exception as e:
+            # self.conn.close()
+            raise e
+        # cur.close()
+        # self.conn.close()
+        return data
+
+    @metrics.instrumented
+    def query_many(self, sql, args=None, page=1, count=10):
+        """分页查询"""
+        # cur = self.conn.cursor()
+        try:
+            with self.connection() as conn:
+                with conn.cursor(cursor_factory=self._row_cursor) as cur:
+                    cur.execute(sql, args)
+                    metrics.mark("execute")
+                    cur.scroll((page - 1) * count)
+                    data = cur.fetchmany(count)
+                    if self.row_format != "dict":
+                        data = convert(cur, data, self.row_format)
+                    else:
+                        data = list(map(dict, data))
+                    size = cur.rowcount
+        except Exception as e:
+            # self.conn.close()
+            raise e
+        # cur.close()
+        # self.conn.close()
+        return data, size
+
+    @metrics.instrumented
+    def query_keyset(self, sql, args=None, order_by="id", after=None, count=10, desc=False):
+        """
+        键集分页，深页与第一页代价相同，大表翻页替代 query_many
+        :param sql: 基础查询，不含 ORDER BY / LIMIT
+        :param order_by: 排序列（结果列名），需唯一，可为元组如 ("created_at", "id")
+        :param after: 上一页返回的 next_cursor，None 为第一页
+        :return: data, next_cursor（无下一页为 None）
+        """
+        page_sql, page_args = keyset.keyset_sql(sql, args, order_by, after, count, desc)
+        try:
+            with self.connection() as conn:
+                with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                    cur.execute(page_sql, page_args)
+                    metrics.mark("execute")
+                    data = list(map(dict, cur.fetchall()))
+        except Exception as e:
+            raise e
+        return keyset.next_page(data, order_by, count)
+
+    @cached
+    @metrics.instrumented
+    def query_all(self, sql, args=None):
+        """查询所有"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor(cursor_factory=self._row_cursor) as cur:
+                    cur.execute(sql, args)
+                    metrics.mark("execute")
+                    data = cur.fetchall()
+                    if self.row_format != "dict":
+                        data = convert(cur, data, self.row_format)
+                    else:
+                        data = list(map(dict, data))
+        except Exception as e:
+            raise e
+        return data
+
+    @metrics.instrumented
+    def query_columns(self, sql, args=None, batch_size=10000):
+        """
+        列式查询，返回 {列名: NumPy 数组}，用于统计分析，需 pip install numpy
+        服务端（命名）游标每次取 batch_size 行直接按列转换，不建每行 dict，列类型见 dbs.common.columnar
+        """
+        builder = ColumnBuilder()
+        try:
+            with self.connection() as conn:
+                with conn.cursor(name="columns_{}".format(uuid.uuid4().hex)) as cur:
+                    cur.itersize = batch_size
+                    cur.execute(sql, args)
+                    metrics.mark("execute")
+                    while True:
+                        data = cur.fetchmany(batch_size)
+                        if not data:
+                            break
+                        builder.add(data)
+                    names = columns_of(cur.description or ())
+        except Exception as e:
+            raise e
+        return builder.build(names)
+
+    @metrics.instrumented
+    def export(self, sql, args, path, format="csv", batch_size=10000, schema=None):
+        """
+        导出查询结果到文件，内存中只保留一批行，用于大表导出
+        csv 由 COPY (...) TO STDOUT 在服务端生成直接写入文件，其余格式用服务端（命名）游标每次取 batch_size 行
+        :param path: 输出文件路径
+        :param format: "csv" / "jsonl" / "parquet"（需 pip install pyarrow），见 dbs.common.export
+        :param batch_size: 每批行数
+        :param schema: parquet 列类型（pyarrow.Schema 或 [(列名, 类型)]），默认按第一批推断
+        :return: 导出行数
+        """
+        try:
+            with self.connection() as conn:
+                if format == "csv":
+                    with conn.cursor() as cur, open_copy(path) as f:
+                        query = cur.mogrify(sql, args).decode("utf-8").rstrip().rstrip(";")
+                        cur.copy_expert("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER)".format(query), f, size=65536)
+                        metrics.mark("execute")
+                        return cur.rowcount
+                with Exporter(path, format, schema) as out:
+                    with conn.cursor(name="export_{}".format(uuid.uuid4().hex)) as cur:
+                        cur.itersize = batch_size
+                        cur.execute(sql, args)
+                        metrics.mark("execute")
+                        while True:
+                            data = cur.fetchmany(batch_size)
+                            out.write(data, columns_of(cur.description or ()))
+                            if not data:
+                                break
+        except Exception as e:
+            raise e
+        return out.rows
+
+    def stream(self, sql, args=None, itersize=2000, batch=False, as_dict=True):
+        """
+        服务端（命名）游标流式读取，每次从服务端取 itersize 行，内存占用与结果集大小无关，用于 ETL
+        :param batch: True 时每次 yield 一批 list（最多 itersize 行），否则逐行 yield
+        :param as_dict: False 时行为 tuple，更省内存
+        读取期间占用一个连接和事务；提前结束时事务回滚，游标随之关闭
+        """
+        cursor_factory = psycopg2.extras.RealDictCursor if as_dict else None
+        with self.connection() as conn:
+            with conn.cursor(name="stream_{}".format(uuid.uuid4().hex), cursor_factory=cursor_factory) as cur:
+                cur.itersize = itersize
+                cur.execute(sql, args)
+                if batch:
+                    while True:
+                        rows = cur.fetchmany(itersize)
+                        if not rows:
+                            break
+                        yield rows
+                else:
+                    yield from cur
+
+    @invalidates
+    @metrics.instrumented
+    def insert(self, sql, args=None):
+        """插入数据"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                    cur.execute(sql, args)
+        except Exception as e:
+            raise e
+        return True
+
+    @invalidates
+    @metrics.instrumented
+    def insert_get_id(self, sql, args=None):
+        """插入数据, 获取自增id"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                    cur.execute(sql, args)
+                    last_id = cur.lastrowid  # 需建表使用OID
+                    print(last_id)
+        except Exception as e:
+            raise e
+        return True
+
+    @invalidates
+    @metrics.instrumented
+    def insert_many(self, sql, args, page_size=100):
+        """
+        批量插入数据，每 page_size 条语句合并为一次网络往返
+        :param sql:
+        :param args: tuple list [(),()]
+        :return:
+        """
+        try:
+            with self.connection() as conn:
+                with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                    psycopg2.extras.execute_batch(cur, sql, args, page_size=page_size)
+        except Exception as e:
+            raise e
+        return True
+
+    @invalidates
+    @metrics.instrumented
+    def insert_values(self, sql, args, page_size=1000, template=None):
+        """
+        多行 VALUES 批量插入，每 page_size 行合并为一条语句
+        :param sql: INSERT INTO t (a, b) VALUES %s
+        :param args: tuple list [(),()]
+        :param template: 单行模板，默认 (%s, %s, ...)
+        :return:
+        """
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cur:
+                    psycopg2.extras.execute_values(cur, sql, args, template=template, page_size=page_size)
+        except Exception as e:
+            raise e
+        return True
+
+    @invalidates
+    @metrics.instrumented
+    def copy_from_rows(self, table, columns, rows, page_size=10000):
+        """
+        COPY ... FROM STDIN 批量导入，最快的写入方式
+        :param table: 表名，可带模式 schema.table
+        :param columns: 列名 list，与每行顺序一致
+        :param rows: tuple 的可迭代对象（按页序列化，可边生成边写入；dict 写为 json，list / tuple 写为数组，
+                     其余支持 str / 数字 / 时间 / bytes / uuid，不支持的类型抛 TypeError），
+                     或已是 COPY 文本格式（制表符分隔，\\N 为 NULL）的文件对象 / io.StringIO
+        :param page_size: 每次序列化的行数
+        :return: 导入行数
+        """
+        copy_sql = pgsql.SQL("COPY {} ({}) FROM STDIN").format(
+            pgsql.Identifier(*table.split(".")), pgsql.SQL(", ").join(map(pgsql.Identifier, columns)))
+        source = rows if hasattr(rows, "read") else _CopyRows(rows, page_size)
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.copy_expert(copy_sql, source, size=65536)
+                    data = cur.rowcount
+        except Exception as e:
+            raise e
+        return data
+
+    @invalidates
+    @metrics.instrumented
+    def execute(self, sql, args=None):
+        """执行更新删除操作"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                    cursor.execute(sql, args)
+        except Exception as e:
+            raise e
+        return True
+
+    @invalidates
+    @metrics.instrumented
+    def execute_many(self, sql, args=None, page_size=100):
+        """批量执行更新删除操作，每 page_size 条语句合并为一次网络往返"""
+        try:
+            with self.connection() as conn:
+                with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                    psycopg2.extras.execute_batch(cursor, sql, args, page_size=page_size)
+        except Exception as e:
+            raise e
+        return True
+
+    # def execute_procedure(self, sql):
+    #     """执行存储过程(未测)"""
+    #     try:
+    #         with self.conn:
+    #             with self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+    #                 cursor.execute(sql)
+    #     except Exception as e:
+    #         self.conn.rollback()
+    #         raise e
+    #     return True
+    #
+    # def call_procedure(self, procname, args=()):
+    #     """
+    #     调用写存储过程
+    #     返回和参数一致
+    #     """
+    #     try:
+    #         with self.conn:
+    #             with self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+    #                 data = cursor.callproc(procname, args)
+    #     except Exception as e:
+    #         self.conn.rollback()
+    #         raise e
+    #     return data
+    #
+    # def fetchone_procedure(self, procname, args=()):
+    #     """调用查询存储过程"""
+    #     try:
+    #         with self.conn:
+    #             with self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+    #                 cursor.callproc(procname, args)
+    #                 data = cursor.fetchone()
+    #     except Exception as e:
+    #         self.conn.rollback()
+    #         raise e
+    #     return dict(data)
+    #
+    # def fetchmany_procedure(self, procname, args=(), page=1, count=10):
+    #     """调用查询存储过程"""
+    #     try:
+    #         with self.conn:
+    #             with self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+    #                 cursor.callproc(procname, args)
+    #                 cursor.scroll((page - 1) * count)
+    #                 data = cursor.fetchmany(count)
+    #                 data = list(map(dict, data))
+    #                 size = cursor.rowcount
+    #     except Exception as e:
+    #         self.conn.rollback()
+    #         raise e
+    #     return data, size
+    #
+    # async def fetchall_procedure(self, procname, args=()):
+    #     """调用查询存储过程"""
+    #     try:
+    #         with self.conn:
+    #             with self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+    #                 cursor.callproc(procname, args)
+    #                 data = cursor.fetchall()
+    #                 data = list(map(dict, data))
+    #                 # size = cursor.rowcount
+    #     except Exception as e:
+    #         self.conn.rollback()
+    #         raise e
+    #     return data
+
+    def get_cur(self):
+        """
+        事务操作
+        查询需手动fetch，错误rollback
+        """
+        try:
+            cur = self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        except Exception as e:
+            raise e
+        return cur
+
+    def close_conn(self, cur):
+        self.conn.commit()
+        cur.close()
+        self.conn.close()
+
+
+class PGDBPool(PGDB):
+    """
+    连接池模式，方法与 PGDB 一致，每次调用取出一个连接、用完归还，多线程可并行查询
+    """
+
+    def __init__(self, host="localhost", port=5432, user="postgres", password="", db_name="", timeout=20,
+                 min_conn=2, max_conn=32, pool_timeout=10, ping=True, max_lifetime=3600, cache=None,
+                 row_format="dict"):
+        DB.__init__(self, host, port, user, password, db_name, timeout, cache, row_format)
+        # min_conn 为启动时预建的连接数，归还的连接最多保留 max_conn 个空闲，见 ConnectionPool._putconn
+        self.pool = ConnectionPool(min_conn, max_conn, self.dsn, timeout=pool_timeout, ping=ping,
+                                   max_lifetime=max_lifetime)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """从连接池取出一个连接，with 块内为一个事务，结束后归还"""
+        conn = self.pool.getconn()
+        metrics.mark("acquire")
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.pool.putconn(conn)
+
+    def get_cur(self):
+        """
+        事务操作，从连接池取出一个连接
+        查询需手动fetch，错误rollback，完成后 close_conn(cur) 归还连接
+        """
+        conn = self.pool.getconn()
+        try:
+            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        except Exception as e:
+            self.pool.putconn(conn, close=True)
+            raise e
+        return cur
+
+    def close_conn(self, cur):
+        conn = cur.connection
+        try:
+            conn.commit()
+            cur.close()
+        except Exception as e:
+            self.pool.putconn(conn, close=True)
+            raise e
+        self.pool.putconn(conn)
+
+    def close(self):
+        """关闭连接池"""
+        self.pool.closeall()
+
+
+if __name__ == '__main__':
+    pg = PGDB(password="123456", db_name="medicines")
+    # pg = PGDBPool(password="123456", db_name="medicines")
+    # r = pg.query_one("SELECT * FROM illness WHERE id=%s;", (10,))
+    # r, s = pg.query_many("SELECT * FROM illness WHERE drug_tag=%s;", (10,), page=2, count=3)
+    # r, next_cursor = pg.query_keyset("SELECT * FROM illness WHERE drug_tag=%s", (10,), order_by="id", count=3)
+    # r = pg.query_all("SELECT * FROM illness WHERE drug_tag=%s;", (10,))
+    # for rows in pg.stream("SELECT * FROM illness WHERE drug_tag=%s;", (10,), itersize=10000, batch=True):
+    #     print(len(rows))
+    # r = pg.insert("INSERT INTO illness (name, spell, user_id, drug_tag) VALUES(%s, %s, %s, %s) RETURNING id;",  ('脑子有病', 'nzyb', 0, 10))
+    # r = pg.insert_get_id("INSERT INTO illness (name, spell, user_id, drug_tag) VALUES(%s, %s, %s, %s);",  ('脑子有病', 'nzyb', 0, 10))
+    # r = pg.insert_many("INSERT INTO illness (name, spell, user_id, drug_tag) VALUES(%s, %s, %s, %s);",  [('脑子有病4', 'nzyb', 0, 10), ('脑子有病5', 'nzyb', 0, 10)])
+    # r = pg.insert_values("INSERT INTO illness (name, spell, user_id, drug_tag) VALUES %s;",  [('脑子有病4', 'nzyb', 0, 10), ('脑子有病5', 'nzyb', 0, 10)])
+    # r = pg.copy_from_rows("illness", ["name", "spell", "user_id", "drug_tag"],  [('脑子有病4', 'nzyb', 0, 10), ('脑子有病5', 'nzyb', 0, 10)])
+    # r = pg.execute("UPDATE illness SET name=%s, spell=%s, user_id=%s, drug_tag=%s WHERE id=%s;",  ('脑子', 'nzyb', 1, 10, 534))
+    # r = pg.execute_many("UPDATE illness SET name=%s, spell=%s, user_id=%s, drug_tag=%s WHERE id=%s;",  [('脑子病4', 'nzyb', 0, 10, 534), ('脑子病5', 'nzyb', 1, 10, 533)])
+    # print(r)